@@ -0,0 +1,149 @@
+"""
+Serialization benchmark for large inventory / vuln responses.
+
+Compares the default FastAPI path (jsonable_encoder + JSONResponse) against
+FastJSONResponse (orjson, no jsonable_encoder) and NDJSON streaming, and
+reports payload sizes with gzip / brotli. Compressed NDJSON goes through the
+same per-chunk flushing as CompressionMiddleware, once with a chunk per
+record and once with NDJSONResponse's batching.
+
+Usage:
+    python benchmarks/bench_serialization.py --subdomains 50000 --findings 200000
+"""
+import argparse
+import gzip
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from modules.serialization import FastJSONResponse, _Compressor, dumps, brotli, iter_ndjson, orjson
+
+
+def make_inventory(n_subdomains):
+    subdomains = [f"host-{i}.sub{i % 97}.example.com" for i in range(n_subdomains)]
+    return {
+        "status": "success",
+        "data": {
+            "target": "example.com",
+            "scan_time": "2026-01-01 00:00:00",
+            "discovery": {"subdomains_count": len(subdomains), "subdomains": subdomains},
+            "infrastructure": {
+                "main_target_ports": [{"port": f"{p}/tcp", "state": "open", "service": "http"} for p in range(80, 180)],
+                "technologies": {"url": "http://example.com", "title": "Example", "technologies": ["nginx"]}
+            },
+            "summary": f"Found {len(subdomains)} subdomains and 100 open ports."
+        }
+    }
+
+
+def make_vuln(n_findings):
+    findings = []
+    for i in range(n_findings):
+        findings.append({
+            "template-id": f"template-{i % 500}",
+            "type": "http",
+            "host": f"http://host-{i % 1000}.example.com",
+            "matched-at": f"http://host-{i % 1000}.example.com/path/{i}",
+            "timestamp": "2026-01-01T00:00:00.000000000Z",
+            "info": {
+                "name": f"Finding {i % 500}",
+                "severity": ["info", "low", "medium", "high", "critical"][i % 5],
+                "tags": ["cve", "tech", "exposure"],
+                "classification": {"cve-id": [f"CVE-2021-{10000 + i % 500}"], "cvss-score": 7.5},
+                "description": "Lorem ipsum dolor sit amet, consectetur adipiscing elit."
+            },
+            "extracted-results": [f"value-{i}"],
+            "curl-command": f"curl -X GET http://host-{i % 1000}.example.com/path/{i}"
+        })
+    return {
+        "status": "success",
+        "message": "Step 3 Complete.",
+        "findings_count": n_findings,
+        "nuclei": {"target": "http://example.com", "tool": "nuclei", "findings_count": n_findings, "findings": findings},
+        "nikto": {"info": "disabled"},
+        "zap": {"error": "ZAP not available"}
+    }
+
+
+def timed(fn, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), result
+
+
+def ndjson_records(payload):
+    # Mirrors api._iter_vuln_records / _iter_inventory_records framing
+    if "nuclei" in payload:
+        findings = payload["nuclei"]["findings"]
+        header = dict(payload, nuclei={k: v for k, v in payload["nuclei"].items() if k != "findings"})
+        records = [{"record": "summary", **header}] + [{"record": "finding", **f} for f in findings]
+    else:
+        data = payload["data"]
+        header = {k: v for k, v in data.items() if k != "discovery"}
+        records = [{"record": "inventory", **header}] + [{"record": "subdomain", "host": s} for s in data["discovery"]["subdomains"]]
+    return records
+
+
+def ndjson_bytes(payload):
+    return b"".join(dumps(r) + b"\n" for r in ndjson_records(payload))
+
+
+def compressed_stream_size(chunks, encoding):
+    # What CompressionMiddleware sends for a streamed body: one flush per chunk
+    compressor = _Compressor(encoding, 6, 4)
+    size = sum(len(compressor.compress(chunk, flush=True)) for chunk in chunks)
+    return size + len(compressor.finish())
+
+
+def bench(name, payload, repeat):
+    print(f"\n=== {name} ===")
+    default_ms, default_body = timed(lambda: JSONResponse(jsonable_encoder(payload)).body, repeat)
+    fast_ms, fast_body = timed(lambda: FastJSONResponse(payload).body, repeat)
+    ndjson_ms, ndjson_body = timed(lambda: ndjson_bytes(payload), repeat)
+
+    print(f"{'path':<40}{'median ms':>12}{'bytes':>14}")
+    print(f"{'jsonable_encoder + JSONResponse':<40}{default_ms:>12.1f}{len(default_body):>14}")
+    print(f"{'FastJSONResponse (orjson)' if orjson else 'FastJSONResponse (json fallback)':<40}{fast_ms:>12.1f}{len(fast_body):>14}")
+    print(f"{'NDJSON (full stream)':<40}{ndjson_ms:>12.1f}{len(ndjson_body):>14}")
+    print(f"speedup vs default: {default_ms / fast_ms:.1f}x")
+
+    gzip_ms, gz = timed(lambda: gzip.compress(fast_body, compresslevel=6), 1)
+    print(f"{'gzip -6':<40}{gzip_ms:>12.1f}{len(gz):>14}")
+    if brotli is not None:
+        br_ms, br = timed(lambda: brotli.compress(fast_body, quality=4), 1)
+        print(f"{'brotli q4':<40}{br_ms:>12.1f}{len(br):>14}")
+    else:
+        print("brotli not installed; skipping")
+
+    records = ndjson_records(payload)
+    for encoding in ("gzip", "br") if brotli is not None else ("gzip",):
+        per_record_ms, per_record = timed(
+            lambda: compressed_stream_size((dumps(r) + b"\n" for r in records), encoding), repeat)
+        batched_ms, batched = timed(lambda: compressed_stream_size(iter_ndjson(records), encoding), repeat)
+        print(f"{f'NDJSON {encoding}, flush per record':<40}{per_record_ms:>12.1f}{per_record:>14}")
+        print(f"{f'NDJSON {encoding}, 64KB batches':<40}{batched_ms:>12.1f}{batched:>14}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark API response serialization")
+    parser.add_argument("--subdomains", type=int, default=50000)
+    parser.add_argument("--findings", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    bench(f"Inventory ({args.subdomains} subdomains)", make_inventory(args.subdomains), args.repeat)
+    bench(f"Vuln scan ({args.findings} findings)", make_vuln(args.findings), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
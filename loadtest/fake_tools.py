@@ -0,0 +1,199 @@
+"""
+Simulated scanner binaries for offline load testing.
+
+install_fake_tools() writes small launchers for nmap, subfinder, amass, httpx,
+nuclei, ZAP and Nikto into a bin directory. Point VAPT_TOOLS_DIR at that
+directory and the API's tool discovery uses them before any installed tool
+(Go bin, Program Files, /opt, PATH). Nikto is run as "perl nikto.pl ...", so
+the directory holds a fake perl plus a placeholder nikto.pl.
+
+Each fake sleeps for a configurable delay and emits a configurable amount of
+realistic output. The config is read from the FAKE_TOOLS_CONFIG environment
+variable (JSON), e.g.:
+    {"nmap": {"delay": 0.5, "items": 50}, "nuclei": {"delay": 2, "items": 1000}}
+"""
+import json
+import os
+import sys
+import time
+
+TOOLS = ["nmap", "subfinder", "amass", "httpx", "nuclei", "zap.bat", "zap.sh", "perl"]
+
+DEFAULT_CONFIG = {
+    "nmap": {"delay": 0.5, "items": 20},
+    "subfinder": {"delay": 0.5, "items": 200},
+    "amass": {"delay": 1.0, "items": 200},
+    "httpx": {"delay": 0.2, "items": 1},
+    "nuclei": {"delay": 2.0, "items": 100},
+    "zap": {"delay": 3.0, "items": 1},
+    "nikto": {"delay": 1.0, "items": 50},
+}
+
+
+def load_config():
+    config = {tool: dict(values) for tool, values in DEFAULT_CONFIG.items()}
+    for tool, values in json.loads(os.environ.get("FAKE_TOOLS_CONFIG", "{}")).items():
+        config.setdefault(tool, {}).update(values)
+    return config
+
+
+def _arg_after(args, flag, default=None):
+    if flag in args and args.index(flag) + 1 < len(args):
+        return args[args.index(flag) + 1]
+    return default
+
+
+def fake_nmap(args, items):
+    xml_out = _arg_after(args, "-oX")
+    ports = [1000 + i for i in range(items)]
+    if xml_out:
+        hosts_file = _arg_after(args, "-iL")
+        if hosts_file:
+            with open(hosts_file) as f:
+                hosts = [line.strip() for line in f if line.strip()]
+        else:
+            hosts = [a for a in args[args.index("-oX") + 2:] if not a.startswith("-")]
+        with open(xml_out, "w") as f:
+            f.write('<?xml version="1.0"?><nmaprun>')
+            for host in hosts:
+                f.write(f'<host><address addr="127.0.0.1" addrtype="ipv4"/>'
+                        f'<hostnames><hostname name="{host}" type="user"/></hostnames><ports>')
+                for port in ports:
+                    f.write(f'<port protocol="tcp" portid="{port}"><state state="open"/>'
+                            f'<service name="http" product="fake-httpd" version="1.0"/></port>')
+                f.write("</ports></host>")
+            f.write("</nmaprun>")
+        print("Nmap done")
+        return
+
+    target = args[-1]
+    print(f"Starting Nmap 7.94 ( https://nmap.org )\nNmap scan report for {target} (127.0.0.1)")
+    print("Host is up (0.00010s latency).\nPORT     STATE SERVICE")
+    for port in ports:
+        print(f"{port}/tcp open  http")
+    print(f"\nNmap done: 1 IP address (1 host up) scanned")
+
+
+def fake_subfinder(args, items):
+    domain = _arg_after(args, "-d", "example.com")
+    for i in range(items):
+        print(json.dumps({"host": f"sub{i}.{domain}", "input": domain, "source": "fake"}))
+
+
+def fake_amass(args, items):
+    domain = _arg_after(args, "-d", "example.com")
+    for i in range(items):
+        print(f"amass{i}.{domain}")
+
+
+def fake_httpx(args, items):
+    url = _arg_after(args, "-u", "http://127.0.0.1")
+    print(json.dumps({
+        "url": url, "title": "Fake Site", "status_code": 200,
+        "tech": ["Nginx:1.25.0", "PHP"], "webserver": "nginx/1.25.0", "host": "127.0.0.1"
+    }))
+
+
+def fake_nuclei(args, items):
+    target = _arg_after(args, "-u", "http://127.0.0.1")
+    output = _arg_after(args, "-o")
+    severities = ["info", "low", "medium", "high", "critical"]
+    lines = []
+    for i in range(items):
+        lines.append(json.dumps({
+            "template-id": f"fake-template-{i % 50}",
+            "type": "http",
+            "host": target,
+            "matched-at": f"{target}/path/{i}",
+            "info": {
+                "name": f"Fake finding {i % 50}",
+                "severity": severities[i % len(severities)],
+                "classification": {"cve-id": [f"CVE-2021-{40000 + i % 50}"]},
+                "description": "Simulated finding for load testing."
+            }
+        }))
+    if output:
+        with open(output, "w") as f:
+            f.write("\n".join(lines) + "\n")
+    else:
+        print("\n".join(lines))
+
+
+def fake_zap(args, items):
+    print("ZAP quick scan (simulated) complete")
+
+
+def fake_nikto(args, items):
+    # Called as the fake perl: args[0] is the script (nikto.pl)
+    target = _arg_after(args, "-h", "http://127.0.0.1")
+    output = _arg_after(args, "-o")
+    output_format = _arg_after(args, "-Format", "txt")
+    vulns = [{
+        "id": str(100000 + i),
+        "method": "GET",
+        "url": f"/fake/{i}",
+        "msg": f"Simulated Nikto item {i}.",
+        "references": ""
+    } for i in range(items)]
+
+    if output_format == "json":
+        content = json.dumps({"host": target, "ip": "127.0.0.1", "port": "80", "vulnerabilities": vulns})
+    elif output_format == "xml":
+        rows = "".join(f'<item id="{v["id"]}" method="GET"><description>{v["msg"]}</description>'
+                       f'<uri>{v["url"]}</uri></item>' for v in vulns)
+        content = (f'<niktoscan><scandetails targetip="127.0.0.1" targethostname="{target}" '
+                   f'targetport="80">{rows}</scandetails></niktoscan>')
+    else:
+        content = "\n".join(f"+ {v['url']}: {v['msg']}" for v in vulns)
+
+    if output:
+        with open(output, "w") as f:
+            f.write(content + "\n")
+    else:
+        print(content)
+
+
+HANDLERS = {
+    "nmap": fake_nmap,
+    "subfinder": fake_subfinder,
+    "amass": fake_amass,
+    "httpx": fake_httpx,
+    "nuclei": fake_nuclei,
+    "zap": fake_zap,
+    "nikto": fake_nikto,
+}
+
+
+def main(tool):
+    config = load_config().get(tool, {})
+    time.sleep(float(config.get("delay", 0)))
+    HANDLERS[tool](sys.argv[1:], int(config.get("items", 1)))
+
+
+def install_fake_tools(bin_dir):
+    """
+    Writes one launcher per tool into bin_dir and returns bin_dir.
+    """
+    os.makedirs(bin_dir, exist_ok=True)
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    # Only located by the scanner; the fake perl ignores the script itself
+    with open(os.path.join(bin_dir, "nikto.pl"), "w") as f:
+        f.write("# placeholder for the fake perl launcher\n")
+
+    for name in TOOLS:
+        tool = "zap" if name.startswith("zap") else "nikto" if name == "perl" else name
+        if os.name == "nt":
+            # PATHEXT lets shutil.which("nmap") find nmap.bat
+            path = os.path.join(bin_dir, name if name.endswith(".bat") else f"{name}.bat")
+            with open(path, "w") as f:
+                f.write(f'@echo off\r\n"{sys.executable}" -c "import sys; sys.path.insert(0, r\'{here}\'); '
+                        f'import fake_tools; fake_tools.main(\'{tool}\')" %*\r\n')
+        else:
+            path = os.path.join(bin_dir, name)
+            with open(path, "w") as f:
+                f.write(f"#!{sys.executable}\n"
+                        f"import sys\nsys.path.insert(0, {here!r})\n"
+                        f"import fake_tools\nfake_tools.main({tool!r})\n")
+            os.chmod(path, 0o755)
+    return bin_dir
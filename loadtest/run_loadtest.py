@@ -0,0 +1,296 @@
+"""
+Offline load test for src/api.py.
+
+Starts the API (uvicorn) against simulated tool binaries, drives a weighted mix
+of endpoint traffic at a fixed concurrency, and reports throughput, latency
+percentiles and error rates per endpoint. Results can be saved as a baseline
+and later runs compared against it (exit code 1 on regression).
+
+Usage:
+    python loadtest/run_loadtest.py --concurrency 16 --duration 30
+    python loadtest/run_loadtest.py --mix validate=80,vuln=20 --tool nuclei:delay=5,items=20000
+    python loadtest/run_loadtest.py --save-baseline loadtest/baselines/default.json
+    python loadtest/run_loadtest.py --baseline loadtest/baselines/default.json --tolerance 0.25
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(HERE, "..", "src")
+sys.path.insert(0, HERE)
+
+from fake_tools import DEFAULT_CONFIG, install_fake_tools
+
+ENDPOINTS = {
+    "root": ("GET", "/", None),
+    "validate": ("POST", "/validate", "target"),
+    "scan": ("POST", "/scan", "target"),
+    "inventory": ("POST", "/scan/inventory", "target"),
+    "vuln": ("POST", "/scan/vuln", "target"),
+}
+DEFAULT_MIX = "validate=70,scan=10,inventory=10,vuln=10"
+
+
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}'. Choose from {', '.join(ENDPOINTS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def parse_tool_overrides(values):
+    """
+    "--tool nuclei:delay=5,items=20000" -> {"nuclei": {"delay": 5.0, "items": 20000.0}}
+    """
+    config = {}
+    for value in values or []:
+        tool, _, settings = value.partition(":")
+        for setting in settings.split(","):
+            key, _, number = setting.partition("=")
+            config.setdefault(tool, {})[key] = float(number)
+    return config
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, workdir, bin_dir, tool_config, workers):
+    env = dict(os.environ)
+    env["PATH"] = bin_dir + os.pathsep + env.get("PATH", "")
+    env["VAPT_TOOLS_DIR"] = bin_dir
+    env["FAKE_TOOLS_CONFIG"] = json.dumps(tool_config)
+    env["VAPT_HTTP_BACKEND"] = "httpx"
+
+    command = [sys.executable, "-m", "uvicorn", "api:app",
+               "--app-dir", os.path.abspath(SRC_DIR),
+               "--host", "127.0.0.1", "--port", str(port),
+               "--workers", str(workers), "--log-level", "warning"]
+    server = subprocess.Popen(command, cwd=workdir, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/")
+            if conn.getresponse().status == 200:
+                conn.close()
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("API server did not start within 30 seconds")
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class LoadDriver:
+    def __init__(self, port, mix, concurrency, duration, target, request_timeout):
+        self.port = port
+        self.names = list(mix)
+        self.weights = [mix[n] for n in self.names]
+        self.concurrency = concurrency
+        self.duration = duration
+        self.target = target
+        self.request_timeout = request_timeout
+        self.lock = threading.Lock()
+        self.samples = {name: [] for name in self.names}
+        self.errors = {name: {"http": 0, "app": 0, "exception": 0} for name in self.names}
+
+    def _one(self, conn, name):
+        method, path, body_field = ENDPOINTS[name]
+        body = json.dumps({body_field: self.target}) if body_field else None
+        headers = {"Content-Type": "application/json"} if body else {}
+
+        started = time.perf_counter()
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        payload = response.read()
+        elapsed = time.perf_counter() - started
+
+        error = None
+        if response.status != 200:
+            error = "http"
+        else:
+            try:
+                data = json.loads(payload)
+                if isinstance(data, dict) and data.get("status") == "error":
+                    error = "app"
+            except ValueError:
+                error = "http"
+        return elapsed, error
+
+    def _worker(self, stop_at):
+        rng = random.Random()
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=self.request_timeout)
+        while time.time() < stop_at:
+            name = rng.choices(self.names, self.weights)[0]
+            try:
+                elapsed, error = self._one(conn, name)
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=self.request_timeout)
+                with self.lock:
+                    self.errors[name]["exception"] += 1
+                continue
+            with self.lock:
+                self.samples[name].append(elapsed)
+                if error:
+                    self.errors[name][error] += 1
+        conn.close()
+
+    def run(self):
+        started = time.time()
+        stop_at = started + self.duration
+        threads = [threading.Thread(target=self._worker, args=(stop_at,)) for _ in range(self.concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return self.report(time.time() - started)
+
+    def report(self, elapsed):
+        endpoints = {}
+        total_requests = 0
+        total_errors = 0
+        for name in self.names:
+            latencies = sorted(self.samples[name])
+            errors = self.errors[name]
+            count = len(latencies) + errors["exception"]
+            failed = errors["http"] + errors["app"] + errors["exception"]
+            total_requests += count
+            total_errors += failed
+            endpoints[name] = {
+                "requests": count,
+                "throughput_rps": round(len(latencies) / elapsed, 2),
+                "p50_ms": _ms(percentile(latencies, 50)),
+                "p90_ms": _ms(percentile(latencies, 90)),
+                "p99_ms": _ms(percentile(latencies, 99)),
+                "max_ms": _ms(latencies[-1] if latencies else None),
+                "error_rate": round(failed / count, 4) if count else 0.0,
+                "errors": errors,
+            }
+        return {
+            "duration_seconds": round(elapsed, 2),
+            "concurrency": self.concurrency,
+            "total_requests": total_requests,
+            "throughput_rps": round(total_requests / elapsed, 2),
+            "error_rate": round(total_errors / total_requests, 4) if total_requests else 0.0,
+            "endpoints": endpoints,
+        }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+def print_report(report):
+    print(f"\nDuration {report['duration_seconds']}s | concurrency {report['concurrency']} | "
+          f"{report['total_requests']} requests | {report['throughput_rps']} req/s | "
+          f"error rate {report['error_rate']:.2%}")
+    print(f"{'endpoint':<12}{'reqs':>8}{'rps':>9}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>9}")
+    for name, stats in report["endpoints"].items():
+        print(f"{name:<12}{stats['requests']:>8}{stats['throughput_rps']:>9}"
+              f"{str(stats['p50_ms']):>10}{str(stats['p90_ms']):>10}{str(stats['p99_ms']):>10}"
+              f"{str(stats['max_ms']):>10}{stats['error_rate']:>9.2%}")
+
+
+def compare_to_baseline(report, baseline, tolerance):
+    """
+    Flags endpoints whose p99 latency or error rate got worse than the
+    baseline by more than `tolerance` (fractional), or whose throughput dropped.
+    """
+    regressions = []
+    for name, stats in report["endpoints"].items():
+        base = baseline.get("endpoints", {}).get(name)
+        if not base:
+            continue
+        if stats["p99_ms"] and base.get("p99_ms") and stats["p99_ms"] > base["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {stats['p99_ms']}ms vs baseline {base['p99_ms']}ms")
+        if base.get("throughput_rps") and stats["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {stats['throughput_rps']} rps vs baseline {base['throughput_rps']} rps")
+        if stats["error_rate"] > base.get("error_rate", 0) + tolerance / 10:
+            regressions.append(f"{name}: error rate {stats['error_rate']:.2%} vs baseline {base.get('error_rate', 0):.2%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline API load test with simulated tools")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of traffic")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Weighted endpoint mix (default {DEFAULT_MIX})")
+    parser.add_argument("--tool", action="append", help="Fake tool settings, e.g. nuclei:delay=5,items=20000")
+    parser.add_argument("--target", default="127.0.0.1", help="Target sent in requests (must resolve offline)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--request-timeout", type=float, default=120)
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--save-baseline", help="Store this run as a baseline file")
+    parser.add_argument("--baseline", help="Compare against a stored baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed fractional regression vs baseline")
+    args = parser.parse_args()
+
+    tool_config = {tool: dict(values) for tool, values in DEFAULT_CONFIG.items()}
+    for tool, values in parse_tool_overrides(args.tool).items():
+        tool_config.setdefault(tool, {}).update(values)
+
+    with tempfile.TemporaryDirectory(prefix="vapt_loadtest_") as workdir:
+        bin_dir = install_fake_tools(os.path.join(workdir, "bin"))
+        port = free_port()
+        print(f"[*] Starting API on 127.0.0.1:{port} with simulated tools ({bin_dir})...")
+        server = start_server(port, workdir, bin_dir, tool_config, args.workers)
+        try:
+            print(f"[*] Driving '{args.mix}' at concurrency {args.concurrency} for {args.duration}s...")
+            driver = LoadDriver(port, parse_mix(args.mix), args.concurrency, args.duration,
+                                args.target, args.request_timeout)
+            report = driver.run()
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    report["config"] = {"mix": args.mix, "tools": tool_config, "workers": args.workers}
+    print_report(report)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"[+] Report written to {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(report, baseline, args.tolerance)
+        if regressions:
+            print("\n[!] Regressions against baseline:")
+            for line in regressions:
+                print(f"    {line}")
+            sys.exit(1)
+        print(f"\n[+] Within {args.tolerance:.0%} of baseline {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Deliberately vulnerable HTTP stub for exercising modules.verifier offline.
+
+Serves what the bundled check plugins look for: an exposed /.git/config, a
+directory listing under /files/, the Apache 2.4.49 traversal response and no
+security headers. /slow/ sleeps to exercise check timeouts.
+
+Usage:
+    python loadtest/vulnerable_stub.py --port 8099
+    python loadtest/vulnerable_stub.py --port 8099 --patched   # everything fixed
+"""
+import argparse
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PASSWD = "root:x:0:0:root:/root:/bin/bash\ndaemon:x:1:1:daemon:/usr/sbin:/usr/sbin/nologin\n"
+GIT_CONFIG = "[core]\n\trepositoryformatversion = 0\n\tbare = false\n"
+# Only the encoded forms Apache 2.4.49 / 2.4.50 failed to normalize
+TRAVERSAL_PATHS = {
+    "/icons/.%2e/%2e%2e/%2e%2e/%2e%2e/etc/passwd",
+    "/icons/.%%32%65/.%%32%65/.%%32%65/.%%32%65/etc/passwd",
+}
+LISTING = "<html><head><title>Index of /files</title></head><body><h1>Index of /files</h1></body></html>"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    patched = False
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, headers=None):
+        data = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        path = self.path
+        if path.startswith("/slow/"):
+            time.sleep(30)
+        if self.patched:
+            secure = {
+                "Strict-Transport-Security": "max-age=31536000",
+                "Content-Security-Policy": "default-src 'self'",
+                "X-Frame-Options": "DENY",
+                "X-Content-Type-Options": "nosniff",
+                "Referrer-Policy": "no-referrer",
+            }
+            self._send(404 if path != "/" else 200, "Not Found" if path != "/" else "ok", secure)
+            return
+
+        if path == "/.git/config":
+            self._send(200, GIT_CONFIG)
+        elif path.startswith("/files"):
+            self._send(200, LISTING)
+        elif path in TRAVERSAL_PATHS:
+            self._send(200, PASSWD)
+        else:
+            self._send(200, "<html>Welcome</html>")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vulnerable HTTP stub for verification checks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--patched", action="store_true", help="Serve a fixed (non-vulnerable) site")
+    args = parser.parse_args()
+
+    StubHandler.patched = args.patched
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    print(f"[*] Vulnerable stub on http://{args.host}:{args.port} ({'patched' if args.patched else 'vulnerable'})")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,31 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from fastapi.responses import FileResponse
+from pydantic import BaseModel, Field
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from typing import List, Optional
 import sys
 import os
+import re
+import zlib
+import mimetypes
 
 # Ensure we can import modules from src
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from modules.input_handler import InputHandler
-from modules.recon import ReconScanner
-from modules.scanner import VulnScanner
+from modules.recon import ReconScanner, MAX_MIN_RATE, MAX_SHARDS
 from modules.scanner import VulnScanner
+from modules.enrichment import get_shared_index
+from modules.triage import get_default_triager
+from modules.verifier import get_default_verifier
+from modules.reporter import ReportGenerator
+from modules.capture import read_log_range, get_log_metadata
+from modules.storage import get_default_storage, MAINTENANCE_INTERVAL_SECONDS
+from modules.serialization import FastJSONResponse, NDJSONResponse, CompressionMiddleware, wants_ndjson
 
-app = FastAPI(title="Auto_VAPT API")
+# orjson-backed responses by default; large endpoints return FastJSONResponse
+# directly so FastAPI's jsonable_encoder pass is skipped entirely
+app = FastAPI(title="Auto_VAPT API", default_response_class=FastJSONResponse)
 
 # Enable CORS so the React Frontend can talk to this Backend
 app.add_middleware(
@@ -24,9 +36,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# br/gzip negotiation for large (and streamed) responses
+app.add_middleware(CompressionMiddleware, minimum_size=4096)
+
+@app.on_event("startup")
+def start_storage_maintenance():
+    # Archives finished runs, purges ZAP sessions and enforces disk quotas
+    get_default_storage().start_maintenance(MAINTENANCE_INTERVAL_SECONDS)
+
 class TargetRequest(BaseModel):
     target: str
 
+class PortScanRequest(BaseModel):
+    targets: List[str]
+    # Each shard is an nmap process; keep both within what one host can sustain
+    shards: int = Field(4, ge=1, le=MAX_SHARDS)
+    min_rate: int = Field(5000, ge=1, le=MAX_MIN_RATE)
+    ports: str = "1-65535"
+    service_detection: bool = True
+    discovery: str = "nmap"  # "nmap" or "connect" (native pre-filter)
+
+class ReportRequest(BaseModel):
+    sources: List[str]  # Filenames inside scans/ (nuclei_*.json, report_full_*.json)
+    format: str = "html"
+    title: Optional[str] = None
+
 @app.get("/")
 def read_root():
     return {"status": "Auto_VAPT Backend is Online"}
@@ -54,26 +88,69 @@ def validate_target_endpoint(request: TargetRequest):
 @app.post("/scan")
 def run_scan_endpoint(request: TargetRequest):
     """
-    Triggers the Recon Module (Nmap).
+    Triggers the Recon Module (Nmap, or the native TCP connect scanner if Nmap is missing).
     Warning: This is synchronous for MVP. Large scans will block.
     """
     scanner = ReconScanner()
     
-    if not scanner.check_nmap_availability():
-        return {"status": "error", "message": "Nmap is not installed on the server."}
-        
-    result = scanner.run_nmap_scan(request.target)
+    if scanner.check_nmap_availability():
+        result = scanner.run_nmap_scan(request.target)
+    else:
+        result = scanner.run_tcp_connect_scan(request.target)
     
     if "error" in result:
         return {"status": "error", "message": result["error"]}
         
     return {"status": "success", "data": result}
 
+def _iter_inventory_records(inventory):
+    # First line: everything except the (potentially huge) subdomain list
+    header = {k: v for k, v in inventory.items() if k != "discovery"}
+    header["subdomains_count"] = inventory["discovery"]["subdomains_count"]
+    yield {"record": "inventory", "status": "success", **header}
+    for subdomain in inventory["discovery"]["subdomains"]:
+        yield {"record": "subdomain", "host": subdomain}
+
+def _iter_vuln_records(response):
+    nuclei = response["nuclei"]
+    header = dict(response)
+    header["nuclei"] = {k: v for k, v in nuclei.items() if k != "findings"}
+    yield {"record": "summary", **header}
+    for finding in nuclei.get("findings", []):
+        yield {"record": "finding", **finding}
+
+@app.post("/scan/ports/full")
+def run_full_port_scan_endpoint(request: PortScanRequest):
+    """
+    Two-phase full-range port scan (discovery, then -sV on open ports)
+    sharded across parallel nmap processes. Falls back to connect-only
+    discovery when Nmap is missing.
+    """
+    try:
+        scanner = ReconScanner()
+        result = scanner.run_full_port_scan(
+            request.targets,
+            shards=request.shards,
+            min_rate=request.min_rate,
+            ports=request.ports,
+            service_detection=request.service_detection,
+            discovery=request.discovery
+        )
+
+        if "error" in result:
+            return {"status": "error", "message": result["error"]}
+
+        return FastJSONResponse({"status": "success", "data": result})
+    except Exception as e:
+        print(f"CRITICAL ERROR in /scan/ports/full: {str(e)}")
+        return {"status": "error", "message": f"Internal Server Error: {str(e)}"}
+
 @app.post("/scan/inventory")
-def run_inventory_scan_endpoint(request: TargetRequest):
+def run_inventory_scan_endpoint(request: TargetRequest, http_request: Request, format: Optional[str] = None):
     """
     Step 2: Complete Recon & Asset Discovery.
     Consolidates Nmap, Subfinder, Amass, and Tech detection.
+    ?format=ndjson (or Accept: application/x-ndjson) streams one record per line.
     """
     try:
         scanner = ReconScanner()
@@ -82,14 +159,17 @@ def run_inventory_scan_endpoint(request: TargetRequest):
         # Check for success
         if "error" in result:
             return {"status": "error", "message": result["error"]}
+
+        if wants_ndjson(http_request, format):
+            return NDJSONResponse(_iter_inventory_records(result))
             
-        return {"status": "success", "data": result}
+        return FastJSONResponse({"status": "success", "data": result})
     except Exception as e:
         print(f"CRITICAL ERROR in /scan/inventory: {str(e)}")
         return {"status": "error", "message": f"Internal Server Error: {str(e)}"}
 
 @app.post("/scan/vuln")
-def run_vuln_scan_endpoint(request: TargetRequest):
+def run_vuln_scan_endpoint(request: TargetRequest, http_request: Request, format: Optional[str] = None):
     """
     Step 3: Automated Vulnerability Scanner.
     Runs Nuclei and Nikto, consolidates reports.
@@ -99,13 +179,33 @@ def run_vuln_scan_endpoint(request: TargetRequest):
         
         # Check tool availability (Nuclei + ZAP)
         avail = scanner.check_tools_availability()
-        if not avail["nuclei"] and not avail["zap"]:
-            return {"status": "error", "message": "No vulnerability scanners (Nuclei/ZAP) available."}
+        if not avail["nuclei"] and not avail["zap"] and not avail["nikto"]:
+            return {"status": "error", "message": "No vulnerability scanners (Nuclei/Nikto/ZAP) available."}
             
         nuclei_result = scanner.run_nuclei_scan(request.target) if avail["nuclei"] else {"error": "Nuclei not available"}
         
-        # Nikto disabled by user request
-        nikto_result = {"info": "Nikto scan disabled by policy."}
+        # Offline CVE / KEV / EPSS correlation (only if an index has been built)
+        cve_index = get_shared_index()
+        if cve_index and nuclei_result.get("findings"):
+            nuclei_result["enriched_count"] = cve_index.enrich_findings(nuclei_result["findings"])
+
+        # Step 5: safe PoV checks for findings that have a check plugin (VAPT_VERIFY=1)
+        verifier = get_default_verifier()
+        if verifier and nuclei_result.get("findings"):
+            nuclei_result["verification"] = verifier.verify_findings(nuclei_result["findings"])
+
+        # Step 6: batched, cached false-positive triage (only if a backend is configured)
+        triager = get_default_triager()
+        if triager and nuclei_result.get("findings"):
+            nuclei_result["triage"] = triager.triage_findings(nuclei_result["findings"])
+
+        # Keep the annotations (CVE/KEV enrichment, verification, triage) with the
+        # stored scan, so reports generated from it show them
+        if any(key in nuclei_result for key in ("enriched_count", "verification", "triage")):
+            scanner.save_nuclei_findings(nuclei_result)
+        
+        # Nikto runs sharded (by host x tuning group) under a time budget
+        nikto_result = scanner.run_nikto_sharded([request.target]) if avail["nikto"] else {"error": "Nikto not available"}
         
         # ZAP Re-enabled
         zap_result = scanner.run_zap_scan(request.target) if avail["zap"] else {"error": "ZAP not available"}
@@ -114,9 +214,11 @@ def run_vuln_scan_endpoint(request: TargetRequest):
         findings_count = 0
         if "findings_count" in nuclei_result:
             findings_count += nuclei_result["findings_count"]
+        if "findings_count" in nikto_result:
+            findings_count += nikto_result["findings_count"]
         
         # Return consolidated report info
-        return {
+        response = {
             "status": "success", 
             "message": f"Step 3 Complete. Detected vulnerabilities and misconfigurations.",
             "findings_count": findings_count,
@@ -124,17 +226,163 @@ def run_vuln_scan_endpoint(request: TargetRequest):
             "nikto": nikto_result,
             "zap": zap_result
         }
+
+        if wants_ndjson(http_request, format):
+            return NDJSONResponse(_iter_vuln_records(response))
+
+        return FastJSONResponse(response)
     except Exception as e:
         print(f"CRITICAL ERROR in /scan/vuln: {str(e)}")
         return {"status": "error", "message": f"Internal Server Error: {str(e)}"}
 
+@app.post("/report/generate")
+def generate_report_endpoint(request: ReportRequest):
+    """
+    Step 7: Report Generation.
+    Streams stored scan data into a JSON/HTML/PDF/DOCX report.
+    """
+    try:
+        storage = get_default_storage()
+        sources = []
+        for name in request.sources:
+            path = storage.resolve_path(name)
+            if path is None:
+                return {"status": "error", "message": f"Scan data not found: {os.path.basename(name)}"}
+            sources.append(path)
+        result = ReportGenerator().generate(sources, fmt=request.format, title=request.title)
+
+        if "error" in result:
+            return {"status": "error", "message": result["error"]}
+
+        return {"status": "success", "data": result}
+    except Exception as e:
+        print(f"CRITICAL ERROR in /report/generate: {str(e)}")
+        return {"status": "error", "message": f"Internal Server Error: {str(e)}"}
+
+# Already-compressed formats are never gzipped again
+NO_GZIP_EXTENSIONS = (".gz", ".zip", ".pdf", ".docx", ".png", ".jpg")
+FILE_CHUNK_SIZE = 64 * 1024
+
+def _iter_file_range(artifact, start, length):
+    with artifact.open() as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(FILE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+def _iter_file_gzip(artifact):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    with artifact.open() as f:
+        while True:
+            chunk = f.read(FILE_CHUNK_SIZE)
+            if not chunk:
+                break
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+    yield compressor.flush()
+
+def _serve_file(request, artifact):
+    """
+    File response with conditional GET (ETag), single byte-range and gzip support.
+    Works for plain files and for members of archived runs alike.
+    """
+    size = artifact.size
+    media_type = mimetypes.guess_type(artifact.name)[0] or "application/octet-stream"
+    etag = artifact.etag
+    headers = {"ETag": etag, "Accept-Ranges": "bytes"}
+
+    if_none_match = [tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")]
+    if etag in if_none_match or etag[:-1] + '-gz"' in if_none_match:
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if range_header:
+        match = re.fullmatch(r"bytes=(\d*)-(\d*)", range_header.strip())
+        if match and (match.group(1) or match.group(2)):
+            if match.group(1):
+                start = int(match.group(1))
+                end = int(match.group(2)) if match.group(2) else size - 1
+            else:
+                # Suffix range: last N bytes
+                start = max(size - int(match.group(2)), 0)
+                end = size - 1
+            end = min(end, size - 1)
+
+            if start > end:
+                return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(
+                _iter_file_range(artifact, start, end - start + 1),
+                status_code=206,
+                headers=headers,
+                media_type=media_type
+            )
+
+    accepts_gzip = "gzip" in request.headers.get("accept-encoding", "")
+    if accepts_gzip and size > 1024 and not artifact.name.lower().endswith(NO_GZIP_EXTENSIONS):
+        headers["ETag"] = etag[:-1] + '-gz"'
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+        return StreamingResponse(
+            _iter_file_gzip(artifact),
+            headers=headers,
+            media_type=media_type
+        )
+
+    if not artifact.archived:
+        return FileResponse(artifact.path, headers=headers, media_type=media_type)
+
+    headers["Content-Length"] = str(size)
+    return StreamingResponse(_iter_file_range(artifact, 0, size), headers=headers, media_type=media_type)
+
 @app.get("/report/{filename}")
-def get_report(filename: str):
+def get_report(filename: str, request: Request):
     """
-    Serves the JSON report file.
+    Serves a report / scan artifact (gzip, ETag and Range aware).
+    The filename's scan id points straight at its run directory or archive.
     """
-    file_path = os.path.join("scans", filename)
-    if os.path.exists(file_path):
-        return FileResponse(file_path)
+    artifact = get_default_storage().locate(filename)
+    if artifact is not None:
+        return _serve_file(request, artifact)
     return {"error": "File not found"}
 
+@app.get("/storage")
+def get_storage_usage():
+    return get_default_storage().usage()
+
+
+@app.get("/logs/{log_id}")
+def get_tool_log(log_id: str, stream: str = "stdout", offset: int = 0, length: int = 65536):
+    """
+    Range read over a captured tool log (see raw_log in scan responses).
+    Returns plain text; Content-Range reports the position in the full log.
+    404 if the log (or its file) is gone, 416 for an offset past the end.
+    """
+    result = read_log_range(log_id, stream, offset, length)
+    if "error" in result:
+        headers = {"Content-Range": f"bytes */{result['total']}"} if "total" in result else None
+        return FastJSONResponse({"error": result["error"]}, status_code=result.get("status", 404), headers=headers)
+
+    headers = {}
+    if result["data"]:
+        end = result["offset"] + len(result["data"]) - 1
+        headers["Content-Range"] = f"bytes {result['offset']}-{end}/{result['total']}"
+    return Response(
+        content=result["data"],
+        media_type="text/plain; charset=utf-8",
+        headers=headers
+    )
+
+@app.get("/logs/{log_id}/meta")
+def get_tool_log_metadata(log_id: str):
+    meta = get_log_metadata(log_id)
+    if meta is None:
+        return {"error": "Log not found"}
+    return meta
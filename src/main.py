@@ -1,49 +1,206 @@
 import argparse
+import contextlib
+import json
 import sys
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Ensure we can import modules from src
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from modules.input_handler import InputHandler
 
+# NOTE: Recon / scanner / enrichment modules are imported lazily inside the
+# pipeline so `--help` and input validation stay fast for cron/CI usage.
+
 def print_banner():
+    # Banner goes to stderr so stdout stays clean JSONL
     print(r"""
-    _   _   _ _____ ___     __  __ _    ___ _____ 
+    _   _   _ _____ ___     __  __ _    ___ _____
    /_\ | | | |_   _/ _ \   \ \/ /   \ | _ \_   _|
-  / _ \| |_| | | || (_) |   >  <| - ||  _/ | |  
- /_/ \_\___/  |_| \___/   /_/\_\_|_||_|   |_|  
+  / _ \| |_| | | || (_) |   >  <| - ||  _/ | |
+ /_/ \_\___/  |_| \___/   /_/\_\_|_||_|   |_|
     AI-Driven Automated VAPT Framework (MVP)
-    """)
+    """, file=sys.stderr)
 
-def main():
-    print_banner()
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+def read_targets(args):
+    """
+    Collects targets from -t and from --targets-file (use '-' for stdin).
+    Blank lines and '#' comments are ignored; duplicates are dropped.
+    """
+    targets = list(args.target or [])
+
+    if args.targets_file:
+        stream = sys.stdin if args.targets_file == "-" else open(args.targets_file, "r")
+        try:
+            for line in stream:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    targets.append(line)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+    return list(dict.fromkeys(targets))
+
+def run_vuln_stage(target, tool_slots=None):
+    """
+    Runs Step 3 for one target. Each external tool process holds one slot of
+    tool_slots while it runs; Nikto shards run in parallel and take one each.
+    """
+    from modules.scanner import VulnScanner
+    from modules.enrichment import get_shared_index
+    from modules.triage import get_default_triager
+    from modules.verifier import get_default_verifier
+
+    slot = tool_slots if tool_slots is not None else contextlib.nullcontext()
+    scanner = VulnScanner()
+    avail = scanner.check_tools_availability()
+    if not avail["nuclei"] and not avail["zap"] and not avail["nikto"]:
+        return {"error": "No vulnerability scanners (Nuclei/Nikto/ZAP) available."}
+
+    with slot:
+        nuclei_result = scanner.run_nuclei_scan(target) if avail["nuclei"] else {"error": "Nuclei not available"}
+
+    cve_index = get_shared_index()
+    if cve_index and nuclei_result.get("findings"):
+        nuclei_result["enriched_count"] = cve_index.enrich_findings(nuclei_result["findings"])
+
+    # Opt-in safe PoV verification (VAPT_VERIFY=1) for findings with a check plugin
+    verifier = get_default_verifier()
+    if verifier and nuclei_result.get("findings"):
+        nuclei_result["verification"] = verifier.verify_findings(nuclei_result["findings"])
+
+    # Opt-in false-positive triage (VAPT_TRIAGE_BACKEND); verdicts are cached across runs
+    triager = get_default_triager()
+    if triager and nuclei_result.get("findings"):
+        nuclei_result["triage"] = triager.triage_findings(nuclei_result["findings"])
+
+    # Keep the annotations (CVE/KEV enrichment, verification, triage) with the
+    # stored scan, so reports generated from it show them
+    if any(key in nuclei_result for key in ("enriched_count", "verification", "triage")):
+        scanner.save_nuclei_findings(nuclei_result)
+
+    nikto_result = scanner.run_nikto_sharded([target], slots=tool_slots) if avail["nikto"] else {"error": "Nikto not available"}
+    with slot:
+        zap_result = scanner.run_zap_scan(target) if avail["zap"] else {"error": "ZAP not available"}
+
+    return {
+        "findings_count": nuclei_result.get("findings_count", 0) + nikto_result.get("findings_count", 0),
+        "nuclei": nuclei_result,
+        "nikto": nikto_result,
+        "zap": zap_result
+    }
+
+def run_pipeline(raw_target, tool_slots, recon_only=False):
+    """
+    Runs Step 1 (validation), Step 2 (recon) and Step 3 (vuln scan) for one target.
+    Every external tool process holds one slot of the global tool budget while
+    it runs: recon holds one, and the vuln stage takes one per process
+    (Nuclei, each parallel Nikto shard, ZAP).
+    """
+    started = time.time()
+    record = {"target": raw_target}
 
-    parser = argparse.ArgumentParser(description="Auto_VAPT: AI-Driven Vulnerability Assessment")
-    parser.add_argument("-t", "--target", help="Target Domain or IP Address to scan", required=True)
-    
-    args = parser.parse_args()
-    
     # --- Step 1: Input Validation ---
-    print(f"[*] Analyzing Target: {args.target}")
-    
     input_handler = InputHandler()
-    valid_target = input_handler.validate_target(args.target)
-    
+    valid_target = input_handler.validate_target(raw_target)
     if not valid_target:
-        print(f"[!] Error: '{args.target}' is not a valid Domain or IP address.")
+        record.update({"status": "invalid", "message": "Invalid Domain or IP format"})
+        return record
+
+    target = valid_target["target"]
+    record.update({"type": valid_target["type"], "cleaned_target": target})
+
+    if not input_handler.check_connectivity(target):
+        record.update({"status": "unreachable", "message": f"Could not resolve '{target}'"})
+        return record
+
+    try:
+        # --- Step 2: Recon & Asset Discovery ---
+        from modules.recon import ReconScanner
+        with tool_slots:
+            log(f"[*] [{target}] Recon started")
+            record["inventory"] = ReconScanner().get_asset_inventory(target)
+        if "error" in record["inventory"]:
+            record.update({"status": "error", "message": record["inventory"]["error"]})
+            return record
+
+        # --- Step 3: Vulnerability Scan ---
+        if not recon_only:
+            log(f"[*] [{target}] Vulnerability scan started")
+            record["vuln"] = run_vuln_stage(target, tool_slots)
+
+        record["status"] = "error" if "error" in record.get("vuln", {}) else "success"
+    except Exception as e:
+        record.update({"status": "error", "message": f"Execution Error: {str(e)}"})
+
+    record["duration_seconds"] = round(time.time() - started, 2)
+    return record
+
+def main():
+    parser = argparse.ArgumentParser(description="Auto_VAPT: AI-Driven Vulnerability Assessment")
+    parser.add_argument("-t", "--target", action="append", help="Target Domain or IP Address to scan (repeatable)")
+    parser.add_argument("-T", "--targets-file", help="File with one target per line ('-' reads stdin)")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of targets processed in parallel")
+    parser.add_argument("--tool-budget", type=int, default=None,
+                        help="Max external tool processes running at once across all jobs; each Nikto shard counts (default: --jobs)")
+    parser.add_argument("-o", "--output", help="Write JSONL results to this file instead of stdout")
+    parser.add_argument("--recon-only", action="store_true", help="Skip the vulnerability scan stage")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Do not print the banner")
+    parser.add_argument("--scope", help="JSON scope file ({\"allow\": [...], \"deny\": [...]}) enforced by every tool stage")
+
+    args = parser.parse_args()
+
+    if not args.quiet:
+        print_banner()
+
+    if args.scope:
+        # Read by modules.scope when the scanners are (lazily) imported
+        os.environ["VAPT_SCOPE_FILE"] = args.scope
+
+    targets = read_targets(args)
+    if not targets:
+        parser.error("no targets given (use -t and/or -T)")
+
+    jobs = max(1, args.jobs)
+    tool_slots = threading.BoundedSemaphore(max(1, args.tool_budget or jobs))
+
+    out = open(args.output, "a", encoding="utf-8") if args.output else sys.stdout
+    write_lock = threading.Lock()
+    summary = {"targets": len(targets), "success": 0, "error": 0, "invalid": 0, "unreachable": 0, "findings": 0}
+    started = time.time()
+
+    log(f"[*] Processing {len(targets)} target(s) with {jobs} job(s)...")
+    try:
+        # Scanner modules print progress to stdout; keep that off the JSONL stream
+        with contextlib.redirect_stdout(sys.stderr), ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = {executor.submit(run_pipeline, t, tool_slots, args.recon_only): t for t in targets}
+            for future in as_completed(futures):
+                record = future.result()
+
+                # Stream each result as soon as its target finishes
+                with write_lock:
+                    out.write(json.dumps(record) + "\n")
+                    out.flush()
+
+                summary[record["status"]] += 1
+                summary["findings"] += record.get("vuln", {}).get("findings_count", 0)
+                log(f"[+] [{record['target']}] {record['status'].upper()}")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    summary["duration_seconds"] = round(time.time() - started, 2)
+    log(f"[*] Summary: {json.dumps(summary)}")
+
+    if summary["error"] or summary["invalid"] or summary["unreachable"]:
         sys.exit(1)
-        
-    print(f"[+] Target Type: {valid_target['type'].upper()}")
-    print(f"[+] Cleaned Target: {valid_target['target']}")
-    
-    print("[*] Checking Connectivity...")
-    if input_handler.check_connectivity(valid_target['target']):
-         print(f"[+] Target is Reachable! Ready for Recon.")
-         # Future: Call Recon Module here
-    else:
-         print(f"[!] Warning: Could not resolve '{valid_target['target']}'. Is it online?")
-         sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,316 @@
+import gzip
+import json
+import os
+import re
+import shutil
+import signal
+import subprocess
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime
+
+from modules.storage import LOGS_DIR, STORAGE_ROOT
+
+# Bounded-memory capture of tool stdout/stderr.
+#
+# Tool output is streamed to gzip files under <VAPT_SCANS_DIR>/logs/ while only a small
+# tail is kept in memory. API responses carry the tail plus a log reference;
+# the full log is fetched on demand with range reads (GET /logs/{log_id}).
+#
+# Each log is a multi-member gzip file: every CHUNK_SIZE bytes of output are
+# compressed as an independent member, and the metadata keeps the compressed
+# offset of each member. A range read seeks straight to the member holding its
+# offset and decompresses at most one chunk it does not need. The file is
+# still an ordinary .gz to zcat / gzip.open.
+
+LOG_DIR = os.path.join(STORAGE_ROOT, LOGS_DIR)
+DEFAULT_TAIL_BYTES = 8 * 1024
+READ_CHUNK_SIZE = 64 * 1024
+MAX_RANGE_BYTES = 1024 * 1024
+CHUNK_SIZE = 256 * 1024
+# How long output pumps may lag behind a killed process before we give up on them
+PUMP_JOIN_GRACE_SECONDS = 5
+STREAMS = ("stdout", "stderr")
+
+LOG_ID_REGEX = re.compile(r"^[a-z0-9_-]+_\d{8}_\d{6}_[0-9a-f]{8}$")
+
+
+def find_tool_override(name):
+    """
+    Looks up a tool in VAPT_TOOLS_DIR. Tool discovery checks this before any
+    built-in location (Go bin, Program Files, /opt, PATH), so a directory of
+    wrappers or fakes always wins. None when unset or the tool is not there.
+    """
+    tools_dir = os.environ.get("VAPT_TOOLS_DIR")
+    if not tools_dir:
+        return None
+    path = shutil.which(name, path=tools_dir)
+    if path:
+        return path
+    # Scripts such as nikto.pl are run through an interpreter and need not be executable
+    candidate = os.path.join(tools_dir, name)
+    return candidate if os.path.isfile(candidate) else None
+
+
+def _log_path(log_id, stream, log_dir=LOG_DIR):
+    return os.path.join(log_dir, f"{log_id}.{stream}.gz")
+
+
+def _meta_path(log_id, log_dir=LOG_DIR):
+    return os.path.join(log_dir, f"{log_id}.json")
+
+
+class CapturedOutput:
+    """
+    Result of a captured tool run. Mirrors the parts of CompletedProcess the
+    scanners use (returncode, stdout, stderr) but stdout/stderr are tails only.
+    """
+    def __init__(self, log_id, tool, returncode, tails, sizes, log_dir):
+        self.log_id = log_id
+        self.tool = tool
+        self.returncode = returncode
+        self.stdout = tails.get("stdout", b"").decode("utf-8", errors="replace")
+        self.stderr = tails.get("stderr", b"").decode("utf-8", errors="replace")
+        self.sizes = {s: sizes.get(s, 0) for s in STREAMS}
+        self.log_dir = log_dir
+
+    def iter_lines(self, stream="stdout"):
+        """
+        Streams the full output back from disk, one decoded line at a time.
+        """
+        with gzip.open(_log_path(self.log_id, stream, self.log_dir), "rt", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                yield line.rstrip("\r\n")
+
+    def reference(self):
+        return {
+            "log_id": self.log_id,
+            "stdout_bytes": self.sizes["stdout"],
+            "stderr_bytes": self.sizes["stderr"],
+            "url": f"/logs/{self.log_id}"
+        }
+
+
+class ChunkedGzipWriter:
+    """
+    Writes a multi-member gzip file, one member per chunk_size bytes of input,
+    and records the compressed offset where each member starts.
+    """
+    def __init__(self, path, chunk_size=CHUNK_SIZE, compresslevel=6):
+        self._file = open(path, "wb")
+        self.chunk_size = chunk_size
+        self.compresslevel = compresslevel
+        self.index = []
+        self._buffer = bytearray()
+
+    def _flush_chunk(self, data):
+        self.index.append(self._file.tell())
+        self._file.write(gzip.compress(data, compresslevel=self.compresslevel, mtime=0))
+
+    def write(self, data):
+        self._buffer += data
+        while len(self._buffer) >= self.chunk_size:
+            self._flush_chunk(bytes(self._buffer[:self.chunk_size]))
+            del self._buffer[:self.chunk_size]
+
+    def close(self):
+        if self._file.closed:
+            return
+        if self._buffer or not self.index:
+            self._flush_chunk(bytes(self._buffer))
+            self._buffer.clear()
+        self._file.close()
+
+
+def _pump(pipe, gz_file, tails, sizes, stream, tail_bytes):
+    tail = bytearray()
+    total = 0
+    try:
+        for chunk in iter(lambda: pipe.read1(READ_CHUNK_SIZE), b""):
+            gz_file.write(chunk)
+            total += len(chunk)
+            tail += chunk
+            if len(tail) > tail_bytes:
+                del tail[:-tail_bytes]
+    finally:
+        pipe.close()
+        gz_file.close()
+        tails[stream] = bytes(tail)
+        sizes[stream] = total
+
+
+def _kill_process_tree(process):
+    """
+    Kills the tool and everything it started. With shell=True (ZAP) the
+    direct child is only the shell; the tool itself is a grandchild that
+    holds the output pipes, so the whole process group has to go.
+    """
+    if os.name == "nt":
+        subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    else:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+    try:
+        process.kill()
+    except OSError:
+        pass
+
+
+def run_captured(command, tool, timeout=None, cwd=None, shell=False,
+                 tail_bytes=DEFAULT_TAIL_BYTES, log_dir=LOG_DIR):
+    """
+    Runs a tool like subprocess.run(capture_output=True), but spills the full
+    stdout/stderr to compressed files and keeps only the last `tail_bytes`
+    of each in memory. Raises subprocess.TimeoutExpired like subprocess.run.
+    """
+    if not os.path.exists(log_dir):
+        os.makedirs(log_dir, exist_ok=True)
+
+    log_id = f"{tool}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    started = time.time()
+
+    process = subprocess.Popen(
+        command,
+        cwd=cwd,
+        shell=shell,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        # Own process group, so a timeout can kill the tool's children too
+        start_new_session=os.name != "nt",
+        creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if os.name == "nt" else 0
+    )
+
+    tails, sizes = {}, {}
+    gz_files = {s: ChunkedGzipWriter(_log_path(log_id, s, log_dir)) for s in STREAMS}
+    pumps = [
+        threading.Thread(
+            target=_pump,
+            args=(getattr(process, s), gz_files[s], tails, sizes, s, tail_bytes),
+            daemon=True
+        )
+        for s in STREAMS
+    ]
+    for t in pumps:
+        t.start()
+
+    deadline = started + timeout if timeout else None
+    try:
+        returncode = process.wait(timeout=timeout)
+    except BaseException:
+        # Timeout (or interrupt): take down the tool's whole process tree
+        _kill_process_tree(process)
+        process.wait()
+        raise
+    finally:
+        # Children that outlive the tool keep the pipes open; they get until
+        # the deadline, then the process group is killed
+        for t in pumps:
+            t.join(None if deadline is None else max(deadline - time.time(), 0) + PUMP_JOIN_GRACE_SECONDS)
+        if any(t.is_alive() for t in pumps):
+            _kill_process_tree(process)
+            for t in pumps:
+                t.join(PUMP_JOIN_GRACE_SECONDS)
+
+        with open(_meta_path(log_id, log_dir), "w") as f:
+            json.dump({
+                "log_id": log_id,
+                "tool": tool,
+                "command": command if isinstance(command, str) else " ".join(str(c) for c in command),
+                "returncode": process.returncode,
+                "stdout_bytes": sizes.get("stdout", 0),
+                "stderr_bytes": sizes.get("stderr", 0),
+                "chunk_size": CHUNK_SIZE,
+                "stdout_index": gz_files["stdout"].index,
+                "stderr_index": gz_files["stderr"].index,
+                "started": datetime.fromtimestamp(started).isoformat(),
+                "duration_seconds": round(time.time() - started, 2)
+            }, f)
+
+    return CapturedOutput(log_id, tool, returncode, tails, sizes, log_dir)
+
+
+def get_log_metadata(log_id, log_dir=LOG_DIR):
+    if not LOG_ID_REGEX.match(log_id or ""):
+        return None
+    path = _meta_path(log_id, log_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _read_chunked(path, index, chunk_size, offset, length):
+    """
+    Range read over a ChunkedGzipWriter file: seeks to the member holding
+    `offset` and decompresses members until `length` bytes are collected.
+    """
+    first = offset // chunk_size
+    skip = offset - first * chunk_size
+    out = bytearray()
+    with open(path, "rb") as f:
+        f.seek(index[first])
+        decompressor = zlib.decompressobj(wbits=31)
+        pending = b""
+        while len(out) < skip + length:
+            data = pending or f.read(READ_CHUNK_SIZE)
+            pending = b""
+            if not data:
+                break
+            out += decompressor.decompress(data)
+            if decompressor.eof:
+                # Next member: keep the bytes that belong to it
+                pending = decompressor.unused_data
+                decompressor = zlib.decompressobj(wbits=31)
+    return bytes(out[skip:skip + length])
+
+
+def read_log_range(log_id, stream="stdout", offset=0, length=MAX_RANGE_BYTES, log_dir=LOG_DIR):
+    """
+    Reads `length` bytes of uncompressed output starting at `offset`.
+    Returns {"error": ..., "status": 404 | 416} for unknown or missing logs
+    and offsets past the end, like the scanner methods report errors.
+    """
+    meta = get_log_metadata(log_id, log_dir)
+    if meta is None or stream not in STREAMS:
+        return {"error": "Log not found", "status": 404}
+
+    path = _log_path(log_id, stream, log_dir)
+    if not os.path.exists(path):
+        # Removed by retention while its metadata survived
+        return {"error": "Log file no longer available", "status": 404}
+
+    total = meta[f"{stream}_bytes"]
+    offset = max(0, offset)
+    if offset > total or (offset == total and total > 0):
+        return {"error": f"Offset {offset} is beyond the end of the log", "status": 416, "total": total}
+    length = max(0, min(length, MAX_RANGE_BYTES, total - offset))
+
+    data = b""
+    if length:
+        index = meta.get(f"{stream}_index")
+        if index:
+            data = _read_chunked(path, index, meta["chunk_size"], offset, length)
+        else:
+            # Logs written before chunking: gzip seeks by decompressing from the start
+            with gzip.open(path, "rb") as f:
+                f.seek(offset)
+                data = f.read(length)
+
+    return {"log_id": log_id, "stream": stream, "offset": offset, "total": total, "data": data}
+
+
+def read_file_tail(path, tail_bytes=DEFAULT_TAIL_BYTES):
+    """
+    Returns the last `tail_bytes` of a text file without reading all of it.
+    """
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - tail_bytes))
+        return f.read().decode("utf-8", errors="replace")
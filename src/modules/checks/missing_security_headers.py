@@ -0,0 +1,15 @@
+# Missing HTTP security headers, re-checked on the matched URL.
+
+TEMPLATES = ["http-missing-security-headers"]
+
+HEADERS = ("strict-transport-security", "content-security-policy", "x-frame-options",
+           "x-content-type-options", "referrer-policy")
+
+
+def check(session, finding, base_url):
+    url = finding["matched_at"] or base_url + "/"
+    response = session.get(url)
+    missing = [h for h in HEADERS if h not in response.headers]
+    if missing:
+        return True, f"Missing on {url}: {', '.join(missing)}"
+    return False, f"All checked security headers present on {url}"
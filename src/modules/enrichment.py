@@ -0,0 +1,513 @@
+import argparse
+import bisect
+import csv
+import gzip
+import io
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import uuid
+from datetime import datetime
+
+# Offline CVE enrichment index.
+#
+# Built from downloaded NVD / CISA KEV / FIRST EPSS dumps into a single binary
+# file that is memory-mapped at startup (no JSON parsing on load).
+#
+# File layout (little-endian):
+#   header : magic, version, count, keys_offset, recs_offset, blob_offset
+#   keys   : count * uint64   sorted numeric CVE keys (year * 10^8 + number)
+#   recs   : count * REC      fixed-size numeric fields + pointer into blob
+#   blob   : compact JSON text per CVE (severity, cwe, description, kev info)
+#
+# A mapped file cannot be replaced on Windows, so every build writes a new
+# versioned file (cve_index.<timestamp>_<hex6>.bin) and then points
+# "<index path>.current" at it. Readers resolve the pointer; the shared
+# index reopens when it moves. Old versions are deleted once unmapped.
+
+INDEX_MAGIC = b"VAPTCVE1"
+INDEX_VERSION = 1
+HEADER = struct.Struct("<8sIIQQQ")
+# cvss, epss, epss percentile, flags, reserved, reserved, text offset, text length
+REC = struct.Struct("<fffBBHII")
+FLAG_KEV = 0x01
+
+DEFAULT_INDEX_PATH = os.environ.get("VAPT_CVE_INDEX", os.path.join("data", "cve_index.bin"))
+
+POINTER_SUFFIX = ".current"
+
+CVE_REGEX = re.compile(r"^CVE-(\d{4})-(\d{4,8})$", re.IGNORECASE)
+
+
+def cve_to_key(cve_id):
+    """
+    Converts 'CVE-2021-44228' into a sortable integer key, or None if malformed.
+    """
+    if not cve_id:
+        return None
+    match = CVE_REGEX.match(cve_id.strip())
+    if not match:
+        return None
+    return int(match.group(1)) * 100_000_000 + int(match.group(2))
+
+
+def key_to_cve(key):
+    year, number = divmod(key, 100_000_000)
+    return f"CVE-{year}-{number:04d}"
+
+
+def _open_dump(path):
+    # Dumps are usually distributed gzipped; accept both
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def _parse_nvd(path, records):
+    """
+    Parses an NVD JSON feed (API 2.0 or legacy 1.1 format) into records.
+    """
+    with _open_dump(path) as f:
+        data = json.load(f)
+
+    if "vulnerabilities" in data:
+        # NVD API 2.0 / feed 2.0
+        for item in data["vulnerabilities"]:
+            cve = item.get("cve", {})
+            key = cve_to_key(cve.get("id"))
+            if key is None:
+                continue
+
+            description = ""
+            for desc in cve.get("descriptions", []):
+                if desc.get("lang") == "en":
+                    description = desc.get("value", "")
+                    break
+
+            score, severity = None, None
+            metrics = cve.get("metrics", {})
+            for metric_name in ("cvssMetricV40", "cvssMetricV31", "cvssMetricV30", "cvssMetricV2"):
+                if metrics.get(metric_name):
+                    cvss = metrics[metric_name][0].get("cvssData", {})
+                    score = cvss.get("baseScore")
+                    severity = cvss.get("baseSeverity") or metrics[metric_name][0].get("baseSeverity")
+                    break
+
+            cwes = []
+            for weakness in cve.get("weaknesses", []):
+                for desc in weakness.get("description", []):
+                    value = desc.get("value", "")
+                    if value.startswith("CWE-") and value not in cwes:
+                        cwes.append(value)
+
+            rec = records.setdefault(key, {})
+            rec.update({
+                "cvss": score,
+                "severity": severity,
+                "cwe": cwes,
+                "description": description,
+                "published": cve.get("published"),
+            })
+    elif "CVE_Items" in data:
+        # Legacy 1.1 feeds
+        for item in data["CVE_Items"]:
+            meta = item.get("cve", {}).get("CVE_data_meta", {})
+            key = cve_to_key(meta.get("ID"))
+            if key is None:
+                continue
+
+            description = ""
+            for desc in item.get("cve", {}).get("description", {}).get("description_data", []):
+                if desc.get("lang") == "en":
+                    description = desc.get("value", "")
+                    break
+
+            impact = item.get("impact", {})
+            score, severity = None, None
+            if "baseMetricV3" in impact:
+                score = impact["baseMetricV3"].get("cvssV3", {}).get("baseScore")
+                severity = impact["baseMetricV3"].get("cvssV3", {}).get("baseSeverity")
+            elif "baseMetricV2" in impact:
+                score = impact["baseMetricV2"].get("cvssV2", {}).get("baseScore")
+                severity = impact["baseMetricV2"].get("severity")
+
+            cwes = []
+            for problem in item.get("cve", {}).get("problemtype", {}).get("problemtype_data", []):
+                for desc in problem.get("description", []):
+                    value = desc.get("value", "")
+                    if value.startswith("CWE-") and value not in cwes:
+                        cwes.append(value)
+
+            rec = records.setdefault(key, {})
+            rec.update({
+                "cvss": score,
+                "severity": severity,
+                "cwe": cwes,
+                "description": description,
+                "published": item.get("publishedDate"),
+            })
+    else:
+        print(f"[!] Unrecognized NVD dump format: {path}")
+
+
+def _parse_kev(path, records):
+    """
+    Parses the CISA Known Exploited Vulnerabilities JSON catalog.
+    """
+    with _open_dump(path) as f:
+        data = json.load(f)
+
+    for item in data.get("vulnerabilities", []):
+        key = cve_to_key(item.get("cveID"))
+        if key is None:
+            continue
+        rec = records.setdefault(key, {})
+        rec["kev"] = {
+            "date_added": item.get("dateAdded"),
+            "due_date": item.get("dueDate"),
+            "ransomware": item.get("knownRansomwareCampaignUse") == "Known",
+            "vendor": item.get("vendorProject"),
+            "product": item.get("product"),
+        }
+
+
+def _parse_epss(path, records):
+    """
+    Parses the FIRST EPSS CSV dump (cve,epss,percentile).
+    """
+    with _open_dump(path) as f:
+        # First line is a '#model_version:...' comment
+        lines = (line for line in f if not line.startswith("#"))
+        for row in csv.DictReader(lines):
+            key = cve_to_key(row.get("cve"))
+            if key is None:
+                continue
+            try:
+                rec = records.setdefault(key, {})
+                rec["epss"] = float(row["epss"])
+                rec["epss_percentile"] = float(row["percentile"])
+            except (KeyError, ValueError):
+                continue
+
+
+def _as_float(value):
+    if value is None:
+        return float("nan")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def _clean_float(value):
+    # NaN marks "unknown" inside the fixed-size records
+    return None if value != value else round(value, 4)
+
+
+def write_index(records, output_path):
+    """
+    Writes {key: record} to a sorted, memory-mappable index file.
+    The data goes to a new versioned file and the pointer is swapped
+    atomically, so a running API process never sees a half-written index.
+    """
+    keys = sorted(records)
+    count = len(keys)
+
+    keys_offset = HEADER.size
+    # Keep the uint64 key table 8-byte aligned
+    keys_offset += (-keys_offset) % 8
+    recs_offset = keys_offset + count * 8
+    blob_offset = recs_offset + count * REC.size
+
+    blob = io.BytesIO()
+    rec_table = io.BytesIO()
+    for key in keys:
+        rec = records[key]
+        text = {
+            "severity": rec.get("severity"),
+            "cwe": rec.get("cwe") or [],
+            "description": rec.get("description") or "",
+            "published": rec.get("published"),
+        }
+        if rec.get("kev"):
+            text["kev"] = rec["kev"]
+        text_bytes = json.dumps(text, separators=(",", ":")).encode("utf-8")
+
+        flags = FLAG_KEV if rec.get("kev") else 0
+        rec_table.write(REC.pack(
+            _as_float(rec.get("cvss")),
+            _as_float(rec.get("epss")),
+            _as_float(rec.get("epss_percentile")),
+            flags, 0, 0,
+            blob.tell(), len(text_bytes)
+        ))
+        blob.write(text_bytes)
+
+    directory = os.path.dirname(os.path.abspath(output_path))
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    stem, ext = os.path.splitext(output_path)
+    version_path = f"{stem}.{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}{ext}"
+    with open(version_path, "wb") as f:
+        f.write(HEADER.pack(INDEX_MAGIC, INDEX_VERSION, count, keys_offset, recs_offset, blob_offset))
+        f.write(b"\x00" * (keys_offset - HEADER.size))
+        f.write(struct.pack(f"<{count}Q", *keys))
+        f.write(rec_table.getvalue())
+        f.write(blob.getvalue())
+
+    # Only the small pointer file is swapped; it is never mapped
+    pointer_path = output_path + POINTER_SUFFIX
+    with open(f"{pointer_path}.tmp", "w", encoding="utf-8") as f:
+        f.write(os.path.basename(version_path))
+    os.replace(f"{pointer_path}.tmp", pointer_path)
+    _remove_old_versions(output_path, version_path)
+
+    return count
+
+
+def _remove_old_versions(output_path, keep_path):
+    """
+    Deletes superseded index versions (and a pre-versioning single file).
+    Files still mapped by a running process (Windows) are left for the next build.
+    """
+    stem, ext = os.path.splitext(os.path.basename(output_path))
+    pattern = re.compile(rf"^{re.escape(stem)}\.\d{{8}}_\d{{6}}_[0-9a-f]{{6}}{re.escape(ext)}$")
+    directory = os.path.dirname(os.path.abspath(output_path))
+    stale = [os.path.join(directory, name) for name in os.listdir(directory) if pattern.match(name)]
+    if os.path.isfile(output_path):
+        stale.append(output_path)
+    for path in stale:
+        if os.path.abspath(path) == os.path.abspath(keep_path):
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def resolve_index_path(path):
+    """
+    Returns the current versioned index file for an index path, or the path
+    itself for an index written before versioning.
+    """
+    try:
+        with open(path + POINTER_SUFFIX, "r", encoding="utf-8") as f:
+            name = f.read().strip()
+    except OSError:
+        return path
+    return os.path.join(os.path.dirname(path), name) if name else path
+
+
+def build_index(output_path, nvd_paths=(), kev_paths=(), epss_paths=(), base_path=None):
+    """
+    Builds the index from offline dumps.
+    If base_path points at an existing index, its records are loaded first and
+    the given dumps are layered on top (incremental update, e.g. with only the
+    NVD 'modified' feed and today's KEV/EPSS files).
+    """
+    records = {}
+    # Versioned indexes exist only behind the "<path>.current" pointer
+    if base_path and os.path.exists(resolve_index_path(base_path)):
+        with CVEIndex(base_path) as base:
+            for key, rec in base.iter_records():
+                records[key] = rec
+        print(f"[*] Loaded {len(records)} records from existing index {base_path}")
+
+    for path in nvd_paths:
+        print(f"[*] Parsing NVD dump {path}...")
+        _parse_nvd(path, records)
+    for path in kev_paths:
+        print(f"[*] Parsing CISA KEV catalog {path}...")
+        _parse_kev(path, records)
+    for path in epss_paths:
+        print(f"[*] Parsing EPSS scores {path}...")
+        _parse_epss(path, records)
+
+    count = write_index(records, output_path)
+    print(f"[+] Wrote {count} CVE records to {output_path}")
+    return count
+
+
+class CVEIndex:
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        path = resolve_index_path(path)
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty file cannot be mapped
+            self._file.close()
+            raise ValueError(f"CVE index {path} is empty")
+
+        magic, version, self.count, keys_offset, self._recs_offset, self._blob_offset = HEADER.unpack_from(self._mm, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a CVE index (version {INDEX_VERSION})")
+
+        # Zero-copy view over the sorted key table; bisect runs directly on it
+        self._keys = memoryview(self._mm)[keys_offset:keys_offset + self.count * 8].cast("Q")
+
+    def close(self):
+        if getattr(self, "_keys", None) is not None:
+            self._keys.release()
+            self._keys = None
+        if getattr(self, "_mm", None) is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def _position(self, key):
+        pos = bisect.bisect_left(self._keys, key)
+        if pos < self.count and self._keys[pos] == key:
+            return pos
+        return None
+
+    def _record_at(self, pos):
+        cvss, epss, percentile, flags, _, _, text_off, text_len = REC.unpack_from(
+            self._mm, self._recs_offset + pos * REC.size
+        )
+        start = self._blob_offset + text_off
+        rec = json.loads(self._mm[start:start + text_len])
+        rec.update({
+            "cve": key_to_cve(self._keys[pos]),
+            "cvss": _clean_float(cvss),
+            "epss": _clean_float(epss),
+            "epss_percentile": _clean_float(percentile),
+            "in_kev": bool(flags & FLAG_KEV),
+        })
+        return rec
+
+    def lookup(self, cve_id):
+        """
+        Returns the enrichment record for a CVE id, or None if unknown.
+        """
+        key = cve_to_key(cve_id)
+        if key is None:
+            return None
+        pos = self._position(key)
+        return self._record_at(pos) if pos is not None else None
+
+    def lookup_many(self, cve_ids):
+        """
+        Batch lookup. Each distinct CVE is resolved once, in key order.
+        """
+        keys = {}
+        for cve_id in cve_ids:
+            key = cve_to_key(cve_id)
+            if key is not None:
+                keys.setdefault(key, cve_id.upper())
+
+        results = {}
+        for key in sorted(keys):
+            pos = self._position(key)
+            if pos is not None:
+                results[keys[key]] = self._record_at(pos)
+        return results
+
+    def iter_records(self):
+        for pos in range(self.count):
+            rec = self._record_at(pos)
+            yield self._keys[pos], rec
+
+    def enrich_findings(self, findings):
+        """
+        Attaches CVE / KEV / EPSS data to nuclei findings in place.
+        Reads CVE ids from info.classification.cve-id (string or list).
+        """
+        per_finding = []
+        all_ids = set()
+        for finding in findings:
+            classification = (finding.get("info") or {}).get("classification") or {}
+            cve_ids = classification.get("cve-id") or []
+            if isinstance(cve_ids, str):
+                cve_ids = [cve_ids]
+            cve_ids = [c.upper() for c in cve_ids if c]
+            per_finding.append(cve_ids)
+            all_ids.update(cve_ids)
+
+        resolved = self.lookup_many(all_ids)
+
+        enriched_count = 0
+        for finding, cve_ids in zip(findings, per_finding):
+            matches = [resolved[c] for c in cve_ids if c in resolved]
+            if matches:
+                finding["enrichment"] = matches
+                enriched_count += 1
+        return enriched_count
+
+
+_shared_index = None
+_shared_signature = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_index(path=DEFAULT_INDEX_PATH):
+    """
+    Returns a process-wide CVEIndex, or None if no index has been built.
+    Reopens the index when a rebuild has moved the pointer or replaced the
+    file (different inode / mtime). The previous mapping is not closed
+    explicitly; in-flight lookups keep it alive until they finish.
+    """
+    global _shared_index, _shared_signature
+    resolved = resolve_index_path(path)
+    try:
+        stat = os.stat(resolved)
+    except OSError:
+        return _shared_index
+    signature = (os.path.abspath(resolved), stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    with _shared_lock:
+        if signature != _shared_signature:
+            try:
+                _shared_index = CVEIndex(resolved)
+                _shared_signature = signature
+            except (OSError, ValueError) as e:
+                print(f"[!] Could not load CVE index {resolved}: {e}")
+                return _shared_index
+    return _shared_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the offline CVE/KEV/EPSS enrichment index")
+    parser.add_argument("-o", "--output", default=DEFAULT_INDEX_PATH, help="Index file to write")
+    parser.add_argument("--nvd", nargs="*", default=[], help="NVD JSON feed files (.json or .json.gz)")
+    parser.add_argument("--kev", nargs="*", default=[], help="CISA KEV catalog JSON files")
+    parser.add_argument("--epss", nargs="*", default=[], help="EPSS CSV files (.csv or .csv.gz)")
+    parser.add_argument("--update", action="store_true", help="Merge into the existing index instead of rebuilding")
+    parser.add_argument("--lookup", nargs="*", help="Look up CVE ids in the index and exit")
+    args = parser.parse_args()
+
+    if args.lookup:
+        with CVEIndex(args.output) as index:
+            print(json.dumps(index.lookup_many(args.lookup), indent=2))
+        return
+
+    if not (args.nvd or args.kev or args.epss):
+        print("[!] Nothing to build: pass at least one of --nvd, --kev, --epss")
+        sys.exit(1)
+
+    build_index(
+        args.output,
+        nvd_paths=args.nvd,
+        kev_paths=args.kev,
+        epss_paths=args.epss,
+        base_path=args.output if args.update else None
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+import asyncio
+import json
+import os
+import re
+import ssl
+from urllib.parse import urlsplit
+
+# Native in-process HTTP prober (alternative backend for ReconScanner.run_httpx).
+#
+# Plain asyncio streams, HTTP/1.1 keep-alive with a small per-origin
+# connection pool, bounded concurrency, https -> http fallback for bare
+# hosts, and tech fingerprinting from data/tech_signatures.json.
+
+SIGNATURES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "tech_signatures.json")
+USER_AGENT = "Mozilla/5.0 (compatible; Auto_VAPT-prober/1.0)"
+MAX_BODY_BYTES = 64 * 1024
+MAX_HEADER_LINES = 200
+TITLE_REGEX = re.compile(rb"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+
+
+class ProbeError(Exception):
+    pass
+
+
+def load_signatures(path=SIGNATURES_PATH):
+    """
+    Compiles the local signature file into (name, header rules, body rules, cookie rules).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+
+    compiled = []
+    for sig in raw:
+        compiled.append((
+            sig["name"],
+            [(header.lower(), re.compile(pattern, re.IGNORECASE)) for header, pattern in sig.get("headers", {}).items()],
+            [re.compile(pattern.encode(), re.IGNORECASE) for pattern in sig.get("body", [])],
+            [re.compile(pattern, re.IGNORECASE) for pattern in sig.get("cookies", [])],
+        ))
+    return compiled
+
+
+def fingerprint(signatures, headers, body):
+    """
+    Returns technologies in httpx's "Name:version" / "Name" format.
+    """
+    cookies = " ".join(value for name, value in headers if name == "set-cookie")
+    header_map = {}
+    for name, value in headers:
+        header_map.setdefault(name, value)
+
+    found = []
+    for name, header_rules, body_rules, cookie_rules in signatures:
+        match = None
+        for header, pattern in header_rules:
+            if header in header_map:
+                match = pattern.search(header_map[header])
+                if match:
+                    break
+        if not match:
+            for pattern in cookie_rules:
+                match = pattern.search(cookies)
+                if match:
+                    break
+        if not match:
+            for pattern in body_rules:
+                match = pattern.search(body)
+                if match:
+                    break
+        if match:
+            version = match.group(1) if match.re.groups and match.group(1) else None
+            if isinstance(version, bytes):
+                version = version.decode("utf-8", errors="replace")
+            found.append(f"{name}:{version}" if version else name)
+    return found
+
+
+class _ConnectionPool:
+    """
+    Idle keep-alive connections per (scheme, host, port).
+    """
+    def __init__(self, max_idle_per_origin=8):
+        self.max_idle = max_idle_per_origin
+        self.idle = {}
+
+    def get(self, origin):
+        conns = self.idle.get(origin)
+        while conns:
+            reader, writer = conns.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer
+            writer.close()
+        return None
+
+    def put(self, origin, reader, writer):
+        conns = self.idle.setdefault(origin, [])
+        if len(conns) < self.max_idle:
+            conns.append((reader, writer))
+        else:
+            writer.close()
+
+    def close(self):
+        for conns in self.idle.values():
+            for _, writer in conns:
+                writer.close()
+        self.idle.clear()
+
+
+class HTTPProber:
+    def __init__(self, concurrency=500, timeout=5.0, signatures_path=SIGNATURES_PATH):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.signatures = load_signatures(signatures_path)
+
+        # Scanners probe self-signed / mismatched certs all the time
+        self.ssl_context = ssl.create_default_context()
+        self.ssl_context.check_hostname = False
+        self.ssl_context.verify_mode = ssl.CERT_NONE
+
+    async def _open(self, pool, origin):
+        conn = pool.get(origin)
+        if conn:
+            return conn, True
+        scheme, host, port = origin
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(
+                host, port,
+                ssl=self.ssl_context if scheme == "https" else None,
+                server_hostname=host if scheme == "https" else None
+            ),
+            self.timeout
+        )
+        return (reader, writer), False
+
+    async def _read_response(self, reader):
+        status_line = await reader.readline()
+        if not status_line:
+            raise ProbeError("Connection closed before response")
+        parts = status_line.decode("latin-1").split(" ", 2)
+        if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+            raise ProbeError("Malformed status line")
+        version, status = parts[0], int(parts[1])
+
+        headers = []
+        for _ in range(MAX_HEADER_LINES):
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers.append((name.strip().lower(), value.strip()))
+        header_map = dict(headers)
+
+        # Read at most MAX_BODY_BYTES; the connection is reusable only if the
+        # whole body was consumed and the server did not ask to close it.
+        reusable = version == "HTTP/1.1" and header_map.get("connection", "").lower() != "close"
+        body = b""
+        if header_map.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                size_line = await reader.readline()
+                size = int(size_line.split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunk = await reader.readexactly(size + 2)
+                body += chunk[:-2]
+                if len(body) > MAX_BODY_BYTES:
+                    reusable = False
+                    break
+        elif "content-length" in header_map:
+            length = int(header_map["content-length"])
+            body = await reader.readexactly(min(length, MAX_BODY_BYTES))
+            if length > MAX_BODY_BYTES:
+                reusable = False
+        elif status not in (204, 304) and not (100 <= status < 200):
+            # No framing: body runs until the server closes the connection
+            body = await reader.read(MAX_BODY_BYTES)
+            reusable = False
+
+        return status, headers, body[:MAX_BODY_BYTES], reusable
+
+    async def _fetch(self, pool, url):
+        parts = urlsplit(url)
+        scheme = parts.scheme
+        host = parts.hostname
+        port = parts.port or (443 if scheme == "https" else 80)
+        path = parts.path or "/"
+        if parts.query:
+            path += f"?{parts.query}"
+        origin = (scheme, host, port)
+
+        host_header = host if parts.port is None else f"{host}:{parts.port}"
+        request = (
+            f"GET {path} HTTP/1.1\r\n"
+            f"Host: {host_header}\r\n"
+            f"User-Agent: {USER_AGENT}\r\n"
+            "Accept: */*\r\n"
+            "Connection: keep-alive\r\n\r\n"
+        ).encode("latin-1")
+
+        for attempt in range(2):
+            (reader, writer), reused = await self._open(pool, origin)
+            try:
+                writer.write(request)
+                await writer.drain()
+                status, headers, body, reusable = await asyncio.wait_for(self._read_response(reader), self.timeout)
+            except (ProbeError, ConnectionError, asyncio.IncompleteReadError) :
+                writer.close()
+                # A pooled connection may have been closed by the server; retry once fresh
+                if reused and attempt == 0:
+                    continue
+                raise
+            except BaseException:
+                writer.close()
+                raise
+
+            peer = writer.get_extra_info("peername")
+            if reusable:
+                pool.put(origin, reader, writer)
+            else:
+                writer.close()
+            return status, headers, body, peer[0] if peer else None
+
+    def _build_result(self, url, status, headers, body, ip):
+        title_match = TITLE_REGEX.search(body)
+        title = None
+        if title_match:
+            title = " ".join(title_match.group(1).decode("utf-8", errors="replace").split())
+        header_map = dict(headers)
+        return {
+            "url": url,
+            "title": title,
+            "status_code": status,
+            "technologies": fingerprint(self.signatures, headers, body),
+            "webserver": header_map.get("server"),
+            "ip": ip
+        }
+
+    async def probe(self, pool, target):
+        """
+        Probes one target. Bare hosts (and host:port) try https first, then http,
+        like the httpx binary. Returns the run_httpx 'data' shape.
+        """
+        if target.startswith(("http://", "https://")):
+            candidates = [target]
+        else:
+            candidates = [f"https://{target}", f"http://{target}"]
+
+        last_error = None
+        for url in candidates:
+            try:
+                status, headers, body, ip = await asyncio.wait_for(self._fetch(pool, url), self.timeout * 2)
+                return self._build_result(url, status, headers, body, ip)
+            except (OSError, ssl.SSLError, asyncio.TimeoutError, ProbeError, asyncio.IncompleteReadError, ValueError) as e:
+                last_error = e
+        return {"url": candidates[-1], "error": f"Probe failed: {type(last_error).__name__}: {last_error}"}
+
+    async def probe_many_async(self, targets):
+        pool = _ConnectionPool()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(target):
+            async with semaphore:
+                return await self.probe(pool, target)
+
+        try:
+            return await asyncio.gather(*(bounded(t) for t in targets))
+        finally:
+            pool.close()
+
+    def probe_many(self, targets):
+        """
+        Synchronous entry point: probes all targets, results in input order.
+        """
+        return asyncio.run(self.probe_many_async(list(targets)))
@@ -0,0 +1,222 @@
+import asyncio
+import os
+import socket
+import time
+
+# Native asyncio TCP connect scanner.
+#
+# Used when nmap is not installed, and as a cheap pre-filter so nmap -sV only
+# runs on ports that are actually open. Output matches run_nmap_scan's
+# open_ports entries: {"port": "80/tcp", "state": "open", "service": "http"}.
+
+# Same port list nmap uses for -F (top 100 by frequency)
+TOP_100_SPEC = (
+    "7,9,13,21-23,25-26,37,53,79-81,88,106,110-111,113,119,135,139,143-144,179,199,"
+    "389,427,443-445,465,513-515,543-544,548,554,587,631,646,873,990,993,995,1025-1029,"
+    "1110,1433,1720,1723,1755,1900,2000-2001,2049,2121,2717,3000,3128,3306,3389,3986,"
+    "4899,5000,5009,5051,5060,5101,5190,5357,5432,5631,5666,5800,5900,6000-6001,6646,"
+    "7070,8000,8008-8009,8080-8081,8443,8888,9100,9999-10000,32768,49152-49157"
+)
+
+NMAP_SERVICES_CANDIDATES = [
+    "/usr/share/nmap/nmap-services",
+    "/usr/local/share/nmap/nmap-services",
+    r"C:\Program Files (x86)\Nmap\nmap-services",
+    r"C:\Program Files\Nmap\nmap-services",
+]
+
+# Ports where the server waits for the client to speak first
+HTTP_PORTS = {80, 81, 443, 591, 3000, 5000, 7070, 8000, 8008, 8009, 8080, 8081, 8443, 8888, 9000, 9443}
+TLS_PORTS = {443, 465, 636, 990, 993, 995, 8443, 9443}
+
+
+def parse_port_spec(spec):
+    """
+    Parses "22,80,8000-8100" into a sorted list of unique ports.
+    """
+    ports = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition("-")
+        start = int(start)
+        end = int(end) if end else start
+        if not (1 <= start <= end <= 65535):
+            raise ValueError(f"Invalid port range: {part}")
+        ports.update(range(start, end + 1))
+    return sorted(ports)
+
+
+def format_port_spec(ports):
+    """
+    Inverse of parse_port_spec: [22, 80, 81, 82] -> "22,80-82".
+    """
+    parts = []
+    ports = sorted(set(ports))
+    i = 0
+    while i < len(ports):
+        j = i
+        while j + 1 < len(ports) and ports[j + 1] == ports[j] + 1:
+            j += 1
+        parts.append(str(ports[i]) if i == j else f"{ports[i]}-{ports[j]}")
+        i = j + 1
+    return ",".join(parts)
+
+
+def _top_ports_from_nmap_services(count):
+    for path in NMAP_SERVICES_CANDIDATES:
+        if not os.path.exists(path):
+            continue
+        ranked = []
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                if line.startswith("#"):
+                    continue
+                fields = line.split()
+                if len(fields) >= 3 and fields[1].endswith("/tcp"):
+                    ranked.append((float(fields[2]), int(fields[1].split("/")[0])))
+        ranked.sort(reverse=True)
+        return sorted(port for _, port in ranked[:count])
+    return None
+
+
+def resolve_port_set(port_set):
+    """
+    Resolves a named port set ("top100", "top1000", "full") or an explicit
+    spec ("22,80,8000-8100") into a list of ports.
+    top1000 is ranked from a local nmap-services file when one exists;
+    otherwise it approximates with the top-100 list plus 1-1024.
+    """
+    if port_set in (None, "", "top100"):
+        return parse_port_spec(TOP_100_SPEC)
+    if port_set == "top1000":
+        ports = _top_ports_from_nmap_services(1000)
+        if ports:
+            return ports
+        return sorted(set(parse_port_spec(TOP_100_SPEC)) | set(range(1, 1025)))
+    if port_set == "full":
+        return list(range(1, 65536))
+    return parse_port_spec(port_set)
+
+
+def _service_name(port):
+    try:
+        return socket.getservbyport(port, "tcp")
+    except OSError:
+        return "unknown"
+
+
+class _RTTEstimator:
+    """
+    Per-host adaptive connect timeout (Jacobson/Karels, as TCP does for RTO).
+    RST replies from closed ports are valid RTT samples too, so the estimate
+    converges quickly even on hosts with few open ports.
+    """
+    def __init__(self, initial, minimum, maximum):
+        self.srtt = None
+        self.rttvar = None
+        self.initial = initial
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def sample(self, rtt):
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+
+    @property
+    def timeout(self):
+        if self.srtt is None:
+            return self.initial
+        return min(self.maximum, max(self.minimum, self.srtt + 4 * self.rttvar))
+
+
+class TCPConnectScanner:
+    def __init__(self, global_concurrency=1000, per_host_concurrency=200, timeout=1.5,
+                 min_timeout=0.15, grab_banners=True, banner_timeout=1.0, banner_bytes=256):
+        self.global_concurrency = global_concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.timeout = timeout
+        self.min_timeout = min_timeout
+        self.grab_banners = grab_banners
+        self.banner_timeout = banner_timeout
+        self.banner_bytes = banner_bytes
+
+    async def _grab_banner(self, reader, writer, host, port):
+        try:
+            if port in HTTP_PORTS and port not in TLS_PORTS:
+                writer.write(f"HEAD / HTTP/1.0\r\nHost: {host}\r\n\r\n".encode())
+                await writer.drain()
+            data = await asyncio.wait_for(reader.read(self.banner_bytes), self.banner_timeout)
+        except (OSError, asyncio.TimeoutError):
+            return None
+        banner = data.decode("utf-8", errors="replace").strip()
+        # One line is enough to identify most services
+        return banner.splitlines()[0][:200] if banner else None
+
+    async def _probe(self, host, port, rtt, global_slots):
+        async with global_slots:
+            started = time.monotonic()
+            try:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), rtt.timeout)
+            except ConnectionRefusedError:
+                rtt.sample(time.monotonic() - started)
+                return None
+            except (OSError, asyncio.TimeoutError):
+                return None
+
+            rtt.sample(time.monotonic() - started)
+            entry = {"port": f"{port}/tcp", "state": "open", "service": _service_name(port)}
+            try:
+                if self.grab_banners:
+                    banner = await self._grab_banner(reader, writer, host, port)
+                    if banner:
+                        entry["banner"] = banner
+            finally:
+                writer.close()
+            return entry
+
+    async def _scan_host(self, host, ports, global_slots):
+        # A fixed set of workers pulls from a shared port iterator, so a
+        # full 65k-port scan never materializes 65k pending coroutines
+        rtt = _RTTEstimator(self.timeout, self.min_timeout, self.timeout)
+        try:
+            # Resolve once instead of on every connect
+            infos = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM)
+            address = infos[0][4][0]
+        except (OSError, IndexError):
+            return host, []
+
+        port_iter = iter(ports)
+        open_ports = []
+
+        async def worker():
+            for port in port_iter:
+                entry = await self._probe(address, port, rtt, global_slots)
+                if entry:
+                    open_ports.append(entry)
+
+        await asyncio.gather(*(worker() for _ in range(min(self.per_host_concurrency, len(ports)))))
+        open_ports.sort(key=lambda e: int(e["port"].split("/")[0]))
+        return host, open_ports
+
+    async def scan_hosts_async(self, hosts, ports):
+        global_slots = asyncio.Semaphore(self.global_concurrency)
+        # Keep enough hosts in flight to saturate the global limit, no more
+        host_slots = asyncio.Semaphore(max(1, 2 * self.global_concurrency // self.per_host_concurrency))
+
+        async def bounded(host):
+            async with host_slots:
+                return await self._scan_host(host, ports, global_slots)
+
+        return dict(await asyncio.gather(*(bounded(h) for h in hosts)))
+
+    def scan_hosts(self, hosts, ports):
+        """
+        Scans every host on every port. Returns {host: [open port entries]}.
+        """
+        return asyncio.run(self.scan_hosts_async(list(hosts), list(ports)))
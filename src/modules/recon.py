@@ -2,51 +2,168 @@ import subprocess
 import shutil
 import json
 import os
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from modules.capture import find_tool_override, run_captured
+from modules.http_prober import HTTPProber
+from modules.port_scanner import TOP_100_SPEC, TCPConnectScanner, format_port_spec, parse_port_spec, resolve_port_set
+from modules.scope import ALL_PORTS, get_default_scope
+from modules.storage import get_default_storage
+
+# Upper bounds for request-controlled full-scan tuning
+MAX_SHARDS = 16
+MAX_MIN_RATE = 10000
+# Hosts per phase 2 (-sV) nmap process
+DETECT_BATCH_SIZE = 64
+
+def iter_nmap_xml_hosts(xml_path):
+    """
+    Streams (host, ports) pairs from an nmap -oX file.
+    Uses iterparse and clears each <host> element, so memory stays flat
+    no matter how many hosts the file contains.
+    """
+    for event, elem in ET.iterparse(xml_path, events=("end",)):
+        if elem.tag != "host":
+            continue
+
+        host = None
+        for hostname in elem.iter("hostname"):
+            if hostname.get("type") == "user":
+                host = hostname.get("name")
+                break
+        if not host:
+            address = elem.find("address")
+            host = address.get("addr") if address is not None else None
+
+        ports = []
+        for port in elem.iter("port"):
+            state = port.find("state")
+            if state is None or state.get("state") != "open":
+                continue
+            service = port.find("service")
+            entry = {
+                "port": f"{port.get('portid')}/{port.get('protocol')}",
+                "state": "open",
+                "service": service.get("name", "unknown") if service is not None else "unknown"
+            }
+            if service is not None and service.get("product"):
+                entry["product"] = service.get("product")
+                entry["version"] = service.get("version", "")
+            ports.append(entry)
+
+        elem.clear()
+        if host:
+            yield host, ports
+
 class ReconScanner:
-    def __init__(self):
+    def __init__(self, scope=None):
+        # Authorized scope (modules.scope.ScopeEngine); None means unrestricted
+        self.scope = scope if scope is not None else get_default_scope()
+
         # Explicit Nmap check for Windows
-        self.nmap_path = shutil.which("nmap")
+        self.nmap_path = find_tool_override("nmap") or shutil.which("nmap")
         if not self.nmap_path:
             possible_path = r"C:\Program Files (x86)\Nmap\nmap.exe"
             if os.path.exists(possible_path):
                 self.nmap_path = possible_path
 
+        # HTTP probing backend: "auto" (httpx binary if installed, else native),
+        # "httpx" (binary only) or "native" (in-process asyncio prober)
+        self.http_backend = os.environ.get("VAPT_HTTP_BACKEND", "auto")
+
+        self.storage = get_default_storage()
+        self.output_dir = self.storage.root
+
     def check_nmap_availability(self):
         return self.nmap_path is not None
 
+    def _scope_error(self, target):
+        if self.scope is not None and not self.scope.check(target):
+            print(f"[!] Refusing to scan out-of-scope target: {target}")
+            return {"error": f"Target '{target}' is outside the authorized scope."}
+        return None
+
+    def _filter_scope(self, targets):
+        if self.scope is None:
+            return list(targets), []
+        return self.scope.filter(targets)
+
+    def _scope_ports(self, target, ports):
+        """
+        Narrows a port list to the ports the scope allows on target.
+        """
+        if self.scope is None:
+            return list(ports)
+        return self.scope.allowed_ports(target, ports)
+
+    def _http_target(self, target):
+        """
+        Pins a bare host to the scheme whose port the scope allows, so HTTP
+        probes do not try both 443 and 80. None when neither is allowed.
+        URLs and host:port targets pass through unchanged.
+        """
+        if self.scope is None or "://" in target or ":" in target:
+            return target
+        https_ok, http_ok = self.scope.check(target, 443), self.scope.check(target, 80)
+        if https_ok and http_ok:
+            return target
+        if https_ok:
+            return f"https://{target}"
+        if http_ok:
+            return f"http://{target}"
+        return None
+
+    def _drop_out_of_scope_ports(self, host, open_ports):
+        """
+        Removes results for ports the scope does not allow (defence in depth
+        for tools that were handed a narrowed port list).
+        """
+        if self.scope is None:
+            return open_ports
+        return [p for p in open_ports if self.scope.check(host, int(str(p["port"]).split("/")[0]))]
+
     def run_nmap_scan(self, target):
         """
         Runs a fast Nmap scan (-F) on the target.
         Returns a list of open ports and services.
         """
+        out_of_scope = self._scope_error(target)
+        if out_of_scope:
+            return out_of_scope
+
         if not self.check_nmap_availability():
             print("ERROR: Nmap not found in PATH or standard Program Files.")
             return {"error": "Nmap not installed or not found in PATH"}
 
+        # -F covers the top 100 ports; when the scope allows only some of
+        # them, scan exactly those instead
+        fast_ports = parse_port_spec(TOP_100_SPEC)
+        in_scope_ports = self._scope_ports(target, fast_ports)
+        if not in_scope_ports:
+            return {"error": f"No ports on '{target}' are inside the authorized scope."}
+        port_args = ["-F"] if len(in_scope_ports) == len(fast_ports) else ["-p", format_port_spec(in_scope_ports)]
+
         print(f"[*] Running Nmap Fast Scan on {target}...")
         
         try:
             # Command: nmap -F <target>
             # -F: Fast mode (scan fewer ports than the default scan)
-            command = [self.nmap_path, "-F", target]
+            command = [self.nmap_path] + port_args + [target]
             
             # Using subprocess to run the command
             print(f"DEBUG: Executing command: {' '.join(command)}")
-            result = subprocess.run(
-                command, 
-                capture_output=True, 
-                text=True,
-                stdin=subprocess.DEVNULL
-            )
+            # Full output is spilled to scans/logs; only a tail stays in memory
+            result = run_captured(command, "nmap")
             
             if result.returncode != 0:
                 print(f"ERROR: Nmap failed. Stderr: {result.stderr}")
                 return {"error": f"Nmap Scan Failed: {result.stderr}"}
                 
             # Parse simple output (For MVP, we just return the raw lines that look like ports)
-            output_lines = result.stdout.splitlines()
+            output_lines = result.iter_lines()
             parsed_ports = []
             
             # Basic parsing logic for Nmap text output
@@ -68,16 +185,234 @@ class ReconScanner:
             return {
                 "target": target,
                 "tool": "nmap",
-                "scan_type": "Fast Scan (-F)",
-                "open_ports": parsed_ports,
-                "raw_output": result.stdout
+                "scan_type": f"Fast Scan ({' '.join(port_args)})",
+                "open_ports": self._drop_out_of_scope_ports(target, parsed_ports),
+                "raw_output": result.stdout,  # Tail only; full log via raw_log
+                "raw_log": result.reference()
             }
 
         except Exception as e:
             return {"error": f"Execution Error: {str(e)}"}
 
+    def run_tcp_connect_scan(self, target, port_set="top100", global_concurrency=1000,
+                             per_host_concurrency=200, timeout=1.5, grab_banners=True):
+        """
+        Native asyncio TCP connect scan (no nmap needed).
+        port_set: "top100" (same as nmap -F), "top1000", "full" or a spec like "22,80,8000-8100".
+        Returns the same shape as run_nmap_scan.
+        """
+        out_of_scope = self._scope_error(target)
+        if out_of_scope:
+            return out_of_scope
+
+        try:
+            ports = resolve_port_set(port_set)
+        except ValueError as e:
+            return {"error": str(e)}
+        ports = self._scope_ports(target, ports)
+        if not ports:
+            return {"error": f"No ports on '{target}' are inside the authorized scope."}
+
+        print(f"[*] Running TCP Connect Scan ({len(ports)} ports) on {target}...")
+        try:
+            scanner = TCPConnectScanner(
+                global_concurrency=global_concurrency,
+                per_host_concurrency=per_host_concurrency,
+                timeout=timeout,
+                grab_banners=grab_banners
+            )
+            started = time.time()
+            results = scanner.scan_hosts([target], ports)
+            return {
+                "target": target,
+                "tool": "tcp-connect",
+                "scan_type": f"TCP Connect Scan ({port_set})",
+                "open_ports": self._drop_out_of_scope_ports(target, results.get(target, [])),
+                "duration_seconds": round(time.time() - started, 2)
+            }
+        except Exception as e:
+            return {"error": f"Execution Error: {str(e)}"}
+
+    def _run_nmap_xml(self, args, hosts, tag, timeout):
+        """
+        Runs nmap with XML output for a list of hosts and returns {host: ports}.
+        Hosts are passed in a file (-iL), so no host count hits the command
+        line length limit (32K characters on Windows).
+        """
+        scan_id, run_dir = self.storage.new_scan("nmap")
+        xml_path = os.path.join(run_dir, f"{scan_id}_{tag}.xml")
+        hosts_path = os.path.join(run_dir, f"{scan_id}_{tag}_hosts.txt")
+        with open(hosts_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(hosts) + "\n")
+        command = [self.nmap_path] + args + ["-oX", xml_path, "-iL", hosts_path]
+        print(f"DEBUG: Executing command: {' '.join(command)} ({len(hosts)} hosts)")
+
+        result = run_captured(command, "nmap", timeout=timeout)
+        if result.returncode != 0 or not os.path.exists(xml_path):
+            return {"error": f"Nmap Scan Failed: {result.stderr}", "raw_log": result.reference()}
+
+        return {"hosts": dict(iter_nmap_xml_hosts(xml_path)), "xml_file": xml_path, "raw_log": result.reference()}
+
+    def run_full_port_scan(self, targets, shards=4, min_rate=5000, ports="1-65535",
+                           service_detection=True, timeout=3600, discovery="nmap"):
+        """
+        Two-phase full-range port scan across many hosts.
+        Phase 1: fast open-port discovery over all ports, hosts sharded across
+                 parallel nmap processes (--min-rate tuned, no service probes),
+                 or the native TCP connect scanner when discovery="connect".
+        Phase 2: -sV service detection only on the ports found open; hosts with
+                 the same open ports share one nmap process.
+        shards and min_rate are capped at MAX_SHARDS / MAX_MIN_RATE.
+        Results are parsed from -oX XML with a streaming parser.
+        Without nmap, discovery falls back to the connect scanner and phase 2 is skipped.
+        """
+        if not self.check_nmap_availability():
+            discovery = "connect"
+            service_detection = False
+        shards = max(1, min(int(shards), MAX_SHARDS))
+        min_rate = max(1, min(int(min_rate), MAX_MIN_RATE))
+
+        if isinstance(targets, str):
+            targets = [targets]
+        targets = list(dict.fromkeys(t.strip() for t in targets if t and t.strip()))
+        targets, out_of_scope = self._filter_scope(targets)
+        if not targets:
+            return {"error": "No in-scope targets given" if out_of_scope else "No targets given"}
+
+        try:
+            requested_ports = resolve_port_set(ports)
+        except ValueError as e:
+            return {"error": str(e)}
+
+        # Hosts are grouped by the ports the scope allows on them; each group
+        # is scanned with its own -p list. Without port rules that is one
+        # group covering the whole requested range.
+        groups = {}
+        for target in targets:
+            policy = self.scope.port_policy(target) if self.scope is not None else (ALL_PORTS, frozenset())
+            groups.setdefault(policy, []).append(target)
+        port_groups = []
+        for policy, hosts in groups.items():
+            allowed = self.scope.apply_policy(policy, requested_ports) if self.scope is not None else requested_ports
+            if allowed:
+                port_groups.append((hosts, allowed))
+            else:
+                out_of_scope.extend(hosts)
+        targets = [host for hosts, _ in port_groups for host in hosts]
+        if not targets:
+            return {"error": "No in-scope ports on the given targets"}
+
+        started = time.time()
+        shards = max(1, min(shards, len(targets)))
+        # Round-robin so each shard gets a similar mix of hosts
+        shard_jobs = []
+        for hosts, allowed in port_groups:
+            group_shards = max(1, min(shards, len(hosts)))
+            # Named sets (top100 / top1000 / full) are not nmap syntax: always pass ports
+            port_spec = format_port_spec(allowed)
+            shard_jobs.extend((hosts[i::group_shards], port_spec) for i in range(group_shards))
+
+        open_ports = {}
+        raw_logs = []
+        errors = []
+
+        if discovery == "connect":
+            print(f"[*] Phase 1: TCP connect discovery ({ports}) on {len(targets)} hosts...")
+            scanner = TCPConnectScanner(grab_banners=False)
+            for hosts, allowed in port_groups:
+                found = scanner.scan_hosts(hosts, allowed)
+                open_ports.update((host, host_ports) for host, host_ports in found.items() if host_ports)
+            shard_jobs = []
+        else:
+            print(f"[*] Phase 1: discovering open ports ({ports}) on {len(targets)} hosts in {len(shard_jobs)} shards...")
+
+        def discovery_args(port_spec):
+            return ["-Pn", "-n", "-T4", "--open", "-p", port_spec,
+                    "--min-rate", str(min_rate), "--max-retries", "2"]
+
+        with ThreadPoolExecutor(max_workers=shards) as executor:
+            futures = [executor.submit(self._run_nmap_xml, discovery_args(port_spec), hosts, f"discovery{i}", timeout)
+                       for i, (hosts, port_spec) in enumerate(shard_jobs)]
+            for future in futures:
+                try:
+                    shard = future.result()
+                except subprocess.TimeoutExpired:
+                    errors.append("Discovery shard timed out")
+                    continue
+                raw_logs.append(shard["raw_log"])
+                if "error" in shard:
+                    errors.append(shard["error"])
+                    continue
+                for host, host_ports in shard["hosts"].items():
+                    if host_ports:
+                        open_ports[host] = host_ports
+
+        for host in list(open_ports):
+            open_ports[host] = self._drop_out_of_scope_ports(host, open_ports[host])
+            if not open_ports[host]:
+                del open_ports[host]
+
+        results = open_ports
+        if service_detection and open_ports:
+            print(f"[*] Phase 2: service detection (-sV) on {sum(len(p) for p in open_ports.values())} open ports...")
+            results = {}
+
+            # Hosts with identical open ports are probed together
+            port_groups = {}
+            for host, host_ports in open_ports.items():
+                port_list = ",".join(p["port"].split("/")[0] for p in host_ports)
+                port_groups.setdefault(port_list, []).append(host)
+            batches = [(port_list, hosts[i:i + DETECT_BATCH_SIZE])
+                       for port_list, hosts in port_groups.items()
+                       for i in range(0, len(hosts), DETECT_BATCH_SIZE)]
+
+            def detect(port_list, hosts):
+                return hosts, self._run_nmap_xml(["-Pn", "-n", "-sV", "-T4", "-p", port_list], hosts, "services", timeout)
+
+            with ThreadPoolExecutor(max_workers=shards) as executor:
+                futures = [executor.submit(detect, port_list, hosts) for port_list, hosts in batches]
+                for future in futures:
+                    try:
+                        hosts, detected = future.result()
+                    except subprocess.TimeoutExpired:
+                        errors.append("Service detection timed out")
+                        continue
+                    raw_logs.append(detected["raw_log"])
+                    if "error" in detected:
+                        errors.append(detected["error"])
+                    for host in hosts:
+                        # Keep the phase 1 result rather than losing the host
+                        detected_ports = detected.get("hosts", {}).get(host)
+                        results[host] = detected_ports if detected_ports else open_ports[host]
+            # Hosts whose batch timed out keep their phase 1 result
+            for host, host_ports in open_ports.items():
+                results.setdefault(host, host_ports)
+
+        if discovery == "connect":
+            tool = "tcp-connect+nmap" if service_detection and open_ports else "tcp-connect"
+        else:
+            tool = "nmap"
+
+        return {
+            "tool": tool,
+            "scan_type": f"Two-Phase Full Scan ({discovery} -p {ports}{' + -sV' if service_detection else ''})",
+            "hosts_scanned": len(targets),
+            "out_of_scope": out_of_scope,
+            "hosts_with_open_ports": len(results),
+            "open_ports_total": sum(len(p) for p in results.values()),
+            "hosts": {host: {"open_ports": host_ports} for host, host_ports in results.items()},
+            "errors": errors,
+            "raw_logs": raw_logs,
+            "duration_seconds": round(time.time() - started, 2)
+        }
+
     def _find_go_tool(self, tool_name):
         # Helper to find Go tools in common locations
+        # VAPT_TOOLS_DIR overrides everything (wrappers, load-test fakes)
+        override = find_tool_override(tool_name)
+        if override:
+            return override
+
         # PRIORITIZE Go bin to avoid conflicts (e.g. python 'httpx' module)
         go_bin = os.path.expanduser(r"~\go\bin")
         possible_path = os.path.join(go_bin, f"{tool_name}.exe")
@@ -94,6 +429,10 @@ class ReconScanner:
         """
         Runs Subfinder to discover subdomains.
         """
+        out_of_scope = self._scope_error(target)
+        if out_of_scope:
+            return out_of_scope
+
         subfinder_path = self._find_go_tool("subfinder")
         if not subfinder_path:
             print("ERROR: Subfinder not found in PATH or Go/bin")
@@ -104,14 +443,14 @@ class ReconScanner:
              # subfinder -d <target> -silent -json
             command = [subfinder_path, "-d", target, "-silent", "-json"]
             
-            result = subprocess.run(command, capture_output=True, text=True, stdin=subprocess.DEVNULL)
+            result = run_captured(command, "subfinder")
             
             if result.returncode != 0:
                 print(f"ERROR: Subfinder failed. Stderr: {result.stderr}")
                 print(f"[!] Subfinder Error: {result.stderr}")
                 
             subdomains = []
-            for line in result.stdout.splitlines():
+            for line in result.iter_lines():
                 try:
                     data = json.loads(line)
                     if "host" in data:
@@ -132,6 +471,10 @@ class ReconScanner:
         """
         Runs Amass (Passive) to discover subdomains.
         """
+        out_of_scope = self._scope_error(target)
+        if out_of_scope:
+            return out_of_scope
+
         amass_path = self._find_go_tool("amass")
         if not amass_path:
             return {"error": "Amass not installed or not found in PATH"}
@@ -141,10 +484,10 @@ class ReconScanner:
             # amass enum -passive -d <target>
             command = [amass_path, "enum", "-passive", "-d", target]
             
-            result = subprocess.run(command, capture_output=True, text=True, stdin=subprocess.DEVNULL)
+            result = run_captured(command, "amass")
             
             subdomains = []
-            for line in result.stdout.splitlines():
+            for line in result.iter_lines():
                 line = line.strip()
                 if line:
                     subdomains.append(line)
@@ -158,19 +501,48 @@ class ReconScanner:
         except Exception as e:
             return {"error": f"Execution Error: {str(e)}"}
 
+    def run_http_probe_native(self, targets, concurrency=500, timeout=5.0):
+        """
+        Probes many hosts/URLs in-process (pooled keep-alive, bounded concurrency).
+        Returns one run_httpx-shaped result per in-scope target, in input order,
+        followed by errors for out-of-scope targets.
+        """
+        targets, out_of_scope = self._filter_scope(targets)
+        probe_urls = {t: self._http_target(t) for t in targets}
+        out_of_scope += [t for t in targets if probe_urls[t] is None]
+        targets = [t for t in targets if probe_urls[t] is not None]
+        results = [{"target": t, "error": f"Target '{t}' is outside the authorized scope."} for t in out_of_scope]
+
+        print(f"[*] Running native HTTP prober on {len(targets)} targets...")
+        prober = HTTPProber(concurrency=concurrency, timeout=timeout)
+        return [
+            {"target": target, "tool": "httpx-native", "data": data}
+            for target, data in zip(targets, prober.probe_many(probe_urls[t] for t in targets))
+        ] + results
+
     def run_httpx(self, target):
         """
         Runs httpx for technology detection and status code checking.
+        Falls back to the native prober when the httpx binary is missing.
         """
-        httpx_path = self._find_go_tool("httpx")
+        out_of_scope = self._scope_error(target)
+        if out_of_scope:
+            return out_of_scope
+        probe_url = self._http_target(target)
+        if probe_url is None:
+            return {"error": f"Neither port 80 nor 443 on '{target}' is inside the authorized scope."}
+
+        httpx_path = self._find_go_tool("httpx") if self.http_backend != "native" else None
         if not httpx_path:
-            return {"error": "httpx not installed or not found in PATH"}
+            if self.http_backend == "httpx":
+                return {"error": "httpx not installed or not found in PATH"}
+            return self.run_http_probe_native([target])[0]
 
         print(f"[*] Running httpx Technology Detection on {target} using {httpx_path}...")
         try:
             # httpx -u <target> -td -json -silent
             # -td: Technology Detection
-            command = [httpx_path, "-u", target, "-td", "-json", "-silent"]
+            command = [httpx_path, "-u", probe_url, "-td", "-json", "-silent"]
             
             result = subprocess.run(command, capture_output=True, text=True, stdin=subprocess.DEVNULL)
             
@@ -202,6 +574,10 @@ class ReconScanner:
         Consolidates results from all tools into a structured JSON inventory.
         Fulfills Step 2 'Workflow Connection'.
         """
+        out_of_scope = self._scope_error(target)
+        if out_of_scope:
+            return out_of_scope
+
         print(f"[*] Starting Complete Asset Discovery for: {target}")
         
         # 1. Subdomain Discovery
@@ -211,9 +587,16 @@ class ReconScanner:
         all_subs = set()
         if "subdomains" in subs_sf: all_subs.update(subs_sf["subdomains"])
         if "subdomains" in subs_am: all_subs.update(subs_am["subdomains"])
+
+        # Drop discovered assets that fall outside the authorized scope
+        in_scope, out_of_scope = self._filter_scope(sorted(all_subs))
+        all_subs = set(in_scope)
         
-        # 2. Port Scan
-        ports_root = self.run_nmap_scan(target)
+        # 2. Port Scan (native connect scan when nmap is missing)
+        if self.check_nmap_availability():
+            ports_root = self.run_nmap_scan(target)
+        else:
+            ports_root = self.run_tcp_connect_scan(target)
         
         # 3. Technology Detection
         tech_root = self.run_httpx(target)
@@ -223,7 +606,8 @@ class ReconScanner:
             "scan_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "discovery": {
                 "subdomains_count": len(all_subs),
-                "subdomains": list(all_subs)
+                "subdomains": list(all_subs),
+                "out_of_scope_count": len(out_of_scope)
             },
             "infrastructure": {
                 "main_target_ports": ports_root.get("open_ports", []),
@@ -0,0 +1,285 @@
+import json
+import os
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from modules.storage import get_default_storage
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+SEVERITY_ORDER = ["critical", "high", "medium", "low", "info", "unknown"]
+WRITE_CHUNK_SIZE = 64 * 1024
+
+# PDF / DOCX rendering is CPU heavy; keep it off the API worker threads
+_heavy_pool = None
+
+
+def _get_heavy_pool():
+    global _heavy_pool
+    if _heavy_pool is None:
+        _heavy_pool = ProcessPoolExecutor(max_workers=2)
+    return _heavy_pool
+
+
+def iter_findings(source_paths):
+    """
+    Streams normalized findings from stored scan data.
+    Accepts nuclei JSONL output files and report_full_*.json documents.
+    Only one finding (or one report document) is held in memory at a time.
+    """
+    for path in source_paths:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            first_line = f.readline()
+            try:
+                first = json.loads(first_line) if first_line.strip() else None
+                is_jsonl = isinstance(first, dict)
+            except json.JSONDecodeError:
+                is_jsonl = False
+
+            if is_jsonl:
+                yield _normalize_finding(first)
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield _normalize_finding(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+            else:
+                # Pretty-printed single document (e.g. report_full_*.json)
+                f.seek(0)
+                try:
+                    document = json.load(f)
+                except json.JSONDecodeError:
+                    print(f"[!] Skipping unreadable report source: {path}")
+                    continue
+                step_3 = (document.get("steps") or {}).get("step_3") or {}
+                for finding in (step_3.get("data") or {}).get("findings", []):
+                    yield _normalize_finding(finding)
+
+
+def _normalize_finding(raw):
+    info = raw.get("info") or {}
+    classification = info.get("classification") or {}
+    cves = classification.get("cve-id") or []
+    if isinstance(cves, str):
+        cves = [cves]
+
+    severity = (info.get("severity") or "unknown").lower()
+    if severity not in SEVERITY_ORDER:
+        severity = "unknown"
+
+    kev = [e["cve"] for e in raw.get("enrichment", []) if e.get("in_kev")]
+
+    return {
+        "template_id": raw.get("template-id") or raw.get("templateID") or "",
+        "name": info.get("name") or raw.get("template-id") or "Unnamed finding",
+        "severity": severity,
+        "host": raw.get("host") or "",
+        "matched_at": raw.get("matched-at") or raw.get("matched") or "",
+        "description": (info.get("description") or "").strip(),
+        "cves": [c.upper() for c in cves if c],
+        "kev": kev,
+        "enrichment": raw.get("enrichment", []),
+        "triage": raw.get("triage"),
+    }
+
+
+def _summarize(source_paths):
+    # Cheap streaming pre-pass so the summary can be rendered before the findings
+    counts = dict.fromkeys(SEVERITY_ORDER, 0)
+    targets = set()
+    total = 0
+    for finding in iter_findings(source_paths):
+        counts[finding["severity"]] += 1
+        if finding["host"]:
+            targets.add(finding["host"])
+        total += 1
+    return {
+        "total": total,
+        "severity_counts": [(s, counts[s]) for s in SEVERITY_ORDER],
+        "targets": sorted(targets)[:50],
+    }
+
+
+class _ChunkedWriter:
+    """
+    Buffers small string chunks and flushes them to disk in ~64KB writes.
+    """
+    def __init__(self, f, chunk_size=WRITE_CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = []
+        self.buffered = 0
+
+    def write(self, text):
+        self.buffer.append(text)
+        self.buffered += len(text)
+        if self.buffered >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.f.write("".join(self.buffer))
+            self.buffer = []
+            self.buffered = 0
+
+
+def _render_docx(source_paths, output_path, title, summary):
+    # Runs inside the process pool
+    try:
+        from docx import Document
+    except ImportError:
+        return {"error": "python-docx is not installed; DOCX output unavailable."}
+
+    document = Document()
+    document.add_heading(title, 0)
+    document.add_paragraph(f"Total findings: {summary['total']}")
+
+    summary_table = document.add_table(rows=2, cols=len(summary["severity_counts"]))
+    for i, (severity, count) in enumerate(summary["severity_counts"]):
+        summary_table.cell(0, i).text = severity.capitalize()
+        summary_table.cell(1, i).text = str(count)
+
+    document.add_heading("Findings", level=1)
+    for finding in iter_findings(source_paths):
+        document.add_heading(f"[{finding['severity'].upper()}] {finding['name']}", level=2)
+        document.add_paragraph(f"Asset: {finding['matched_at'] or finding['host']}")
+        if finding["cves"]:
+            document.add_paragraph(f"CVE: {', '.join(finding['cves'])}")
+        if finding["description"]:
+            document.add_paragraph(finding["description"])
+
+    document.save(output_path)
+    return {"report_file": output_path}
+
+
+def _render_pdf(html_path, output_path):
+    # Runs inside the process pool
+    try:
+        from weasyprint import HTML
+        HTML(filename=html_path).write_pdf(output_path)
+        return {"report_file": output_path}
+    except ImportError:
+        pass
+
+    wkhtmltopdf = shutil.which("wkhtmltopdf")
+    if not wkhtmltopdf:
+        return {"error": "No PDF renderer available (install weasyprint or wkhtmltopdf)."}
+
+    result = subprocess.run(
+        [wkhtmltopdf, "--quiet", html_path, output_path],
+        capture_output=True,
+        text=True,
+        timeout=900,
+        stdin=subprocess.DEVNULL
+    )
+    if result.returncode != 0:
+        return {"error": f"wkhtmltopdf failed: {result.stderr}"}
+    return {"report_file": output_path}
+
+
+class ReportGenerator:
+    SUPPORTED_FORMATS = ("json", "html", "pdf", "docx")
+
+    def __init__(self, output_dir=None):
+        # Without an explicit output_dir each report gets its own run directory
+        self.output_dir = output_dir
+        if self.output_dir and not os.path.exists(self.output_dir):
+            os.makedirs(self.output_dir)
+
+        self.env = Environment(
+            loader=FileSystemLoader(TEMPLATE_DIR),
+            autoescape=select_autoescape(["html"]),
+            trim_blocks=True,
+            lstrip_blocks=True
+        )
+
+    def _write_json(self, source_paths, output_path, title, summary):
+        with open(output_path, "w", encoding="utf-8") as f:
+            writer = _ChunkedWriter(f)
+            header = {
+                "title": title,
+                "generated_at": datetime.now().isoformat(),
+                "summary": {
+                    "total": summary["total"],
+                    "severity_counts": dict(summary["severity_counts"]),
+                    "targets": summary["targets"],
+                },
+            }
+            # Emit the header object, then splice the findings array in as a stream
+            writer.write(json.dumps(header)[:-1] + ', "findings": [')
+            for i, finding in enumerate(iter_findings(source_paths)):
+                writer.write(("," if i else "") + "\n" + json.dumps(finding))
+            writer.write("\n]}\n")
+            writer.flush()
+
+    def _write_html(self, source_paths, output_path, title, summary):
+        template = self.env.get_template("report.html")
+        stream = template.generate(
+            title=title,
+            generated_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            findings=iter_findings(source_paths),
+            **summary
+        )
+        with open(output_path, "w", encoding="utf-8") as f:
+            writer = _ChunkedWriter(f)
+            for chunk in stream:
+                writer.write(chunk)
+            writer.flush()
+
+    def generate(self, source_paths, fmt="html", title=None):
+        """
+        Renders a report from stored scan data without loading it all into memory.
+        source_paths: nuclei JSONL files and/or report_full_*.json files.
+        """
+        fmt = fmt.lower()
+        if fmt not in self.SUPPORTED_FORMATS:
+            return {"error": f"Unsupported report format '{fmt}'. Use one of {', '.join(self.SUPPORTED_FORMATS)}."}
+
+        missing = [p for p in source_paths if not os.path.exists(p)]
+        if missing:
+            return {"error": f"Scan data not found: {', '.join(missing)}"}
+
+        title = title or "Auto_VAPT Vulnerability Assessment Report"
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if self.output_dir:
+            report_name, report_dir = f"report_{timestamp}", os.path.abspath(self.output_dir)
+        else:
+            report_name, report_dir = get_default_storage().new_scan("report")
+        output_path = os.path.join(report_dir, f"{report_name}.{fmt}")
+
+        print(f"[*] Generating {fmt.upper()} report from {len(source_paths)} source(s)...")
+        try:
+            summary = _summarize(source_paths)
+
+            if fmt == "json":
+                self._write_json(source_paths, output_path, title, summary)
+            elif fmt == "html":
+                self._write_html(source_paths, output_path, title, summary)
+            elif fmt == "pdf":
+                html_path = os.path.join(report_dir, f"{report_name}.html")
+                self._write_html(source_paths, html_path, title, summary)
+                result = _get_heavy_pool().submit(_render_pdf, html_path, output_path).result()
+                if "error" in result:
+                    return result
+            elif fmt == "docx":
+                source_paths = [os.path.abspath(p) for p in source_paths]
+                result = _get_heavy_pool().submit(_render_docx, source_paths, output_path, title, summary).result()
+                if "error" in result:
+                    return result
+
+            return {
+                "tool": "reporter",
+                "format": fmt,
+                "timestamp": timestamp,
+                "findings_count": summary["total"],
+                "report_file": output_path,
+                "report_filename": os.path.basename(output_path)
+            }
+        except Exception as e:
+            return {"error": f"Report Generation Error: {str(e)}"}
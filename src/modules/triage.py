@@ -0,0 +1,451 @@
+import argparse
+import hashlib
+import ipaddress
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+
+# False-positive triage of nuclei findings with a (local) language model.
+#
+# Findings are reduced to compact, host-independent evidence and keyed by a
+# content hash of (template id, evidence). Identical evidence on many hosts
+# or across rescans is one key, so the model only ever sees unique findings.
+# Verdicts are cached in SQLite; uncached keys are grouped by template and
+# asset type, packed into batched prompts and sent with bounded concurrency.
+#
+# Backends:
+#   stub    deterministic heuristics, no model (offline testing)
+#   ollama  local Ollama server (/api/generate)
+#   openai  any OpenAI-compatible local server (llama.cpp, vLLM, LM Studio)
+
+VERDICTS = ("true_positive", "false_positive", "needs_review")
+
+DEFAULT_CACHE_PATH = os.environ.get("VAPT_TRIAGE_CACHE", os.path.join("data", "triage_cache.sqlite"))
+DEFAULT_BACKEND = os.environ.get("VAPT_TRIAGE_BACKEND")
+DEFAULT_URL = os.environ.get("VAPT_TRIAGE_URL")
+DEFAULT_MODEL = os.environ.get("VAPT_TRIAGE_MODEL", "llama3.2:3b")
+
+BATCH_SIZE = 8
+CONCURRENCY = 4
+EVIDENCE_CHARS = 600
+EXTRACTED_LIMIT = 10
+
+# Headers that differ per host / per request and would defeat the cache
+VOLATILE_HEADERS = ("date", "set-cookie", "etag", "last-modified", "content-length", "expires",
+                    "x-request-id", "x-amz-request-id", "cf-ray", "age", "report-to", "nel")
+BLOCKED_MARKERS = ("cloudflare", "access denied", "request blocked", "captcha", "incapsula",
+                   "akamai", "web application firewall", "mod_security")
+
+
+def _host_tokens(finding):
+    tokens = set()
+    for value in (finding.get("host"), finding.get("matched-at"), finding.get("ip")):
+        if not value:
+            continue
+        hostname = urlsplit(value).hostname if "://" in value else value.split(":")[0]
+        if hostname:
+            tokens.add(hostname.lower())
+    # Longest first so "a.example.com" is replaced before "example.com"
+    return sorted(tokens, key=len, reverse=True)
+
+
+def _scrub(text, tokens):
+    for token in tokens:
+        text = re.sub(re.escape(token), "{host}", text, flags=re.IGNORECASE)
+    return text
+
+
+def _trim_response(response, tokens):
+    """
+    Status line, stable headers and the start of the body, host-independent.
+    """
+    head, separator, body = response.partition("\r\n\r\n")
+    if not separator:
+        head, _, body = response.partition("\n\n")
+    lines = head.splitlines()
+    kept = lines[:1] + [line for line in lines[1:]
+                        if line.split(":", 1)[0].strip().lower() not in VOLATILE_HEADERS]
+    text = "\n".join(kept) + ("\n\n" + body if body else "")
+    return _scrub(text[:EVIDENCE_CHARS], tokens)
+
+
+def _asset_type(finding):
+    protocol = finding.get("type") or "http"
+    target = finding.get("matched-at") or finding.get("host") or ""
+    hostname = urlsplit(target).hostname if "://" in target else target.split(":")[0]
+    scheme = urlsplit(target).scheme if "://" in target else ""
+    try:
+        ipaddress.ip_address(hostname or "")
+        kind = "ip"
+    except ValueError:
+        kind = "domain"
+    return f"{protocol}/{scheme}:{kind}" if scheme else f"{protocol}:{kind}"
+
+
+def build_evidence(finding):
+    """
+    Compact evidence for one finding, with host names and volatile headers removed.
+    """
+    tokens = _host_tokens(finding)
+    matched = finding.get("matched-at") or ""
+    parts = urlsplit(matched) if "://" in matched else None
+    extracted = finding.get("extracted-results") or []
+    if isinstance(extracted, str):
+        extracted = [extracted]
+
+    evidence = {
+        "matcher": finding.get("matcher-name") or "",
+        "path": _scrub((parts.path + ("?" + parts.query if parts.query else "")) if parts else matched, tokens),
+        "extracted": sorted({_scrub(str(e)[:200], tokens) for e in extracted})[:EXTRACTED_LIMIT],
+    }
+    if finding.get("response"):
+        evidence["response"] = _trim_response(finding["response"], tokens)
+    return evidence
+
+
+def evidence_key(template_id, evidence):
+    payload = json.dumps([template_id, evidence], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def build_prompt(template_id, info, asset_type, items):
+    """
+    One prompt per batch: the template context once, then numbered evidence items.
+    """
+    description = (info.get("description") or "").strip().replace("\n", " ")[:300]
+    lines = [
+        "You triage automated vulnerability scanner results for false positives.",
+        f"Template: {template_id} - {info.get('name') or template_id} (severity: {info.get('severity') or 'unknown'})",
+        f"Description: {description}" if description else "",
+        f"Asset type: {asset_type}",
+        "For each item decide true_positive, false_positive or needs_review based on the evidence.",
+        'Reply with JSON only: {"verdicts": [{"id": <item id>, "verdict": "...", "confidence": <0-1>, "reason": "<one sentence>"}]}',
+        "Items:",
+    ]
+    for item_id, evidence in items:
+        lines.append(f"[{item_id}] {json.dumps(evidence, separators=(',', ':'))}")
+    return "\n".join(line for line in lines if line)
+
+
+def parse_verdicts(text, item_ids):
+    """
+    Extracts {item id: verdict dict} from a model reply. Unknown or malformed
+    entries are dropped (those items fall back to needs_review, uncached).
+    """
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if not match:
+        return {}
+    try:
+        data = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return {}
+
+    results = {}
+    for entry in data.get("verdicts", []) if isinstance(data, dict) else []:
+        try:
+            item_id = int(entry.get("id"))
+        except (TypeError, ValueError):
+            continue
+        verdict = str(entry.get("verdict", "")).lower().replace(" ", "_").replace("-", "_")
+        if item_id not in item_ids or verdict not in VERDICTS:
+            continue
+        try:
+            confidence = min(1.0, max(0.0, float(entry.get("confidence", 0.5))))
+        except (TypeError, ValueError):
+            confidence = 0.5
+        results[item_id] = {"verdict": verdict, "confidence": confidence,
+                            "reason": str(entry.get("reason", ""))[:300]}
+    return results
+
+
+class StubBackend:
+    """
+    Deterministic heuristics standing in for a model (offline testing).
+    """
+    name = "stub"
+    model = "heuristic-v1"
+
+    def classify(self, template_id, info, asset_type, items):
+        results = {}
+        for item_id, evidence in items:
+            response = evidence.get("response", "").lower()
+            status_line = response.split("\n", 1)[0]
+            if any(marker in response for marker in BLOCKED_MARKERS):
+                verdict = {"verdict": "false_positive", "confidence": 0.6,
+                           "reason": "Response looks like a WAF / block page."}
+            elif re.search(r"\b(404|403|429|503)\b", status_line):
+                verdict = {"verdict": "false_positive", "confidence": 0.55,
+                           "reason": f"Matched on an error response ({status_line.strip()})."}
+            elif evidence.get("extracted") or evidence.get("matcher"):
+                verdict = {"verdict": "true_positive", "confidence": 0.7,
+                           "reason": "Template matcher / extractor produced concrete evidence."}
+            else:
+                verdict = {"verdict": "needs_review", "confidence": 0.4,
+                           "reason": "No concrete evidence attached to the match."}
+            results[item_id] = verdict
+        return results
+
+
+class LocalLLMBackend:
+    """
+    Local model over HTTP. api="ollama" uses /api/generate; api="openai" uses
+    /v1/chat/completions on any OpenAI-compatible server.
+    """
+    def __init__(self, url=None, model=DEFAULT_MODEL, api="ollama", timeout=120):
+        self.api = api
+        self.name = api
+        self.model = model
+        self.url = (url or ("http://127.0.0.1:11434" if api == "ollama" else "http://127.0.0.1:8080")).rstrip("/")
+        self.timeout = timeout
+        # One keep-alive session shared by the worker threads
+        self.session = requests.Session()
+
+    def _complete(self, prompt):
+        if self.api == "ollama":
+            response = self.session.post(f"{self.url}/api/generate", timeout=self.timeout, json={
+                "model": self.model,
+                "prompt": prompt,
+                "format": "json",
+                "stream": False,
+                "options": {"temperature": 0},
+            })
+            response.raise_for_status()
+            return response.json().get("response", "")
+
+        response = self.session.post(f"{self.url}/v1/chat/completions", timeout=self.timeout, json={
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": 0,
+        })
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"]
+
+    def classify(self, template_id, info, asset_type, items):
+        prompt = build_prompt(template_id, info, asset_type, items)
+        return parse_verdicts(self._complete(prompt), {item_id for item_id, _ in items})
+
+
+def get_backend(name=None, url=None, model=None):
+    name = (name or DEFAULT_BACKEND or "stub").lower()
+    if name == "stub":
+        return StubBackend()
+    if name in ("ollama", "openai"):
+        return LocalLLMBackend(url or DEFAULT_URL, model or DEFAULT_MODEL, api=name)
+    raise ValueError(f"Unknown triage backend '{name}'. Use stub, ollama or openai.")
+
+
+class VerdictCache:
+    """
+    SQLite verdict cache keyed by evidence hash, backend and model (shared
+    by all threads).
+    """
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # Verdicts are per (evidence, backend, model): switching models must
+        # not overwrite another model's cached answers
+        schema = ("CREATE TABLE IF NOT EXISTS verdicts ("
+                  " key TEXT NOT NULL, template_id TEXT, verdict TEXT, confidence REAL,"
+                  " reason TEXT, backend TEXT NOT NULL, model TEXT NOT NULL, created REAL,"
+                  " PRIMARY KEY (key, backend, model))")
+        primary_key = [row[1] for row in self._db.execute("PRAGMA table_info(verdicts)") if row[5]]
+        if primary_key == ["key"]:
+            # Cache files from before the composite key: migrate the rows
+            self._db.execute("ALTER TABLE verdicts RENAME TO verdicts_old")
+            self._db.execute(schema)
+            self._db.execute("INSERT OR IGNORE INTO verdicts SELECT * FROM verdicts_old"
+                             " WHERE backend IS NOT NULL AND model IS NOT NULL")
+            self._db.execute("DROP TABLE verdicts_old")
+        else:
+            self._db.execute(schema)
+        self._db.commit()
+
+    def get_many(self, keys, backend, model):
+        found = {}
+        keys = list(keys)
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                rows = self._db.execute(
+                    f"SELECT key, verdict, confidence, reason FROM verdicts"
+                    f" WHERE backend = ? AND model = ? AND key IN ({','.join('?' * len(chunk))})",
+                    [backend, model] + chunk
+                )
+                for key, verdict, confidence, reason in rows:
+                    found[key] = {"verdict": verdict, "confidence": confidence, "reason": reason}
+        return found
+
+    def put_many(self, entries, backend, model):
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(key, template_id, v["verdict"], v["confidence"], v["reason"], backend, model, now)
+                 for key, template_id, v in entries]
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class Triager:
+    def __init__(self, backend=None, cache_path=DEFAULT_CACHE_PATH, batch_size=BATCH_SIZE, concurrency=CONCURRENCY):
+        self.backend = backend or get_backend()
+        self.cache = VerdictCache(cache_path) if cache_path else None
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+
+    def _run_batch(self, batch):
+        template_id, info, asset_type, items, keys = batch
+        try:
+            results = self.backend.classify(template_id, info, asset_type, items)
+        except (requests.RequestException, ValueError, KeyError, IndexError) as e:
+            return keys, {}, f"{template_id}: {str(e)}"
+        # Item ids are 1-based positions within the batch
+        return keys, {keys[item_id - 1]: verdict for item_id, verdict in results.items()}, None
+
+    def triage_findings(self, findings):
+        """
+        Attaches a "triage" verdict to each nuclei finding in place and
+        returns a summary. Backend calls scale with unique uncached evidence.
+        """
+        started = time.time()
+        backend_name, model = self.backend.name, self.backend.model
+
+        # 1. Reduce findings to unique evidence keys
+        keyed = []
+        unique = {}
+        for finding in findings:
+            template_id = finding.get("template-id") or finding.get("templateID") or ""
+            evidence = build_evidence(finding)
+            key = evidence_key(template_id, evidence)
+            keyed.append(key)
+            if key not in unique:
+                unique[key] = (template_id, finding.get("info") or {}, _asset_type(finding), evidence)
+
+        # 2. Cache lookup
+        verdicts = self.cache.get_many(unique, backend_name, model) if self.cache else {}
+        cached = set(verdicts)
+
+        # 3. Group the rest by (template, asset type) and pack into batches
+        groups = {}
+        for key, (template_id, info, asset_type, evidence) in unique.items():
+            if key not in verdicts:
+                groups.setdefault((template_id, asset_type), (info, []))[1].append((key, evidence))
+
+        batches = []
+        for (template_id, asset_type), (info, entries) in groups.items():
+            for i in range(0, len(entries), self.batch_size):
+                chunk = entries[i:i + self.batch_size]
+                items = [(n + 1, evidence) for n, (_, evidence) in enumerate(chunk)]
+                batches.append((template_id, info, asset_type, items, [key for key, _ in chunk]))
+
+        # 4. Query with bounded concurrency, caching each batch as it lands
+        errors = []
+        if batches:
+            print(f"[*] Triage: {len(findings)} findings -> {len(unique)} unique, "
+                  f"{len(cached)} cached, {len(batches)} batches to {backend_name}/{model}...")
+            with ThreadPoolExecutor(max_workers=max(1, self.concurrency)) as executor:
+                for keys, results, error in executor.map(self._run_batch, batches):
+                    if error:
+                        errors.append(error)
+                    verdicts.update(results)
+                    if self.cache and results:
+                        self.cache.put_many([(key, unique[key][0], v) for key, v in results.items()],
+                                            backend_name, model)
+
+        # 5. Fan verdicts back out to every finding sharing the evidence
+        counts = dict.fromkeys(VERDICTS, 0)
+        for finding, key in zip(findings, keyed):
+            verdict = verdicts.get(key) or {"verdict": "needs_review", "confidence": 0.0,
+                                            "reason": "No verdict from the triage backend."}
+            finding["triage"] = dict(verdict, cached=key in cached, key=key[:16])
+            counts[verdict["verdict"]] += 1
+
+        summary = {
+            "backend": backend_name,
+            "model": model,
+            "total": len(findings),
+            "unique": len(unique),
+            "cache_hits": len(cached),
+            "queried": sum(len(b[4]) for b in batches),
+            "batches": len(batches),
+            "true_positives": counts["true_positive"],
+            "false_positives": counts["false_positive"],
+            "needs_review": counts["needs_review"],
+            "duration_seconds": round(time.time() - started, 2),
+        }
+        if errors:
+            summary["errors"] = errors[:20]
+        return summary
+
+
+_default_triager = None
+
+
+def get_default_triager():
+    """
+    Returns a process-wide Triager when VAPT_TRIAGE_BACKEND is set, else None
+    (triage is opt-in, like CVE enrichment).
+    """
+    global _default_triager
+    if _default_triager is None and DEFAULT_BACKEND:
+        try:
+            _default_triager = Triager(get_backend())
+        except (ValueError, sqlite3.Error) as e:
+            print(f"[!] Could not set up triage backend: {e}")
+            return None
+    return _default_triager
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Triage stored nuclei findings for false positives")
+    parser.add_argument("sources", nargs="+", help="nuclei JSONL output files")
+    parser.add_argument("--backend", default=DEFAULT_BACKEND or "stub", help="stub, ollama or openai")
+    parser.add_argument("--url", default=DEFAULT_URL, help="Model server URL")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="Verdict cache (SQLite)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--show", choices=VERDICTS, help="Also print findings with this verdict")
+    args = parser.parse_args()
+
+    findings = []
+    for path in args.sources:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        findings.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+    if not findings:
+        print("[!] No findings in the given sources")
+        sys.exit(1)
+
+    triager = Triager(get_backend(args.backend, args.url, args.model), args.cache,
+                      batch_size=args.batch_size, concurrency=args.concurrency)
+    print(json.dumps(triager.triage_findings(findings), indent=2))
+    if args.show:
+        for finding in findings:
+            if finding["triage"]["verdict"] == args.show:
+                print(f"{finding.get('template-id')}\t{finding.get('matched-at')}\t{finding['triage']['reason']}")
+
+
+if __name__ == "__main__":
+    main()
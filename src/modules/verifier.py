@@ -0,0 +1,360 @@
+import http.client
+import importlib
+import os
+import pkgutil
+import signal
+import ssl
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from urllib.parse import urlsplit
+
+import requests
+
+from modules import checks
+from modules.scope import get_default_scope
+
+try:
+    import resource  # POSIX only
+except ImportError:
+    resource = None
+
+# Proof-of-vulnerability executor (Step 5).
+#
+# Findings that have a check plugin (modules/checks, keyed by nuclei template
+# id or CVE) are grouped by host:port. Each host:port is one task in a process
+# pool: its checks run one after another on a single keep-alive session, so
+# all requests to a service share connections and one rate limiter. Different
+# services run in parallel. Workers run under rlimits (memory, open files, no core
+# dumps) where the platform has them, and every check has a timeout
+# (SIGALRM in the worker on POSIX, plus an overall deadline in the parent,
+# after which hung workers are terminated).
+
+DEFAULT_WORKERS = int(os.environ.get("VAPT_VERIFY_WORKERS", str(min(32, (os.cpu_count() or 2) * 4))))
+CHECK_TIMEOUT = 15
+REQUEST_TIMEOUT = 10
+REQUESTS_PER_SECOND = 5.0
+WORKER_MEMORY_MB = 512
+WORKER_MAX_FILES = 256
+RAW_BODY_LIMIT = 256 * 1024
+
+SEVERITY_RANK = {"critical": 0, "high": 1, "medium": 2, "low": 3, "info": 4}
+
+
+class CheckTimeout(Exception):
+    pass
+
+
+class RateLimitedSession(requests.Session):
+    """
+    requests.Session that spaces requests to at most `rate` per second and
+    applies a default timeout. One instance is shared by all checks on a host.
+    """
+    def __init__(self, rate=REQUESTS_PER_SECOND, request_timeout=REQUEST_TIMEOUT):
+        super().__init__()
+        self.min_interval = 1.0 / rate if rate > 0 else 0.0
+        self.request_timeout = request_timeout
+        self.next_slot = 0.0
+        self.request_count = 0
+        # Targets under test routinely have self-signed certificates
+        self.verify = False
+        self.headers["User-Agent"] = "Auto_VAPT-verifier"
+
+    def _wait_slot(self):
+        now = time.monotonic()
+        if now < self.next_slot:
+            time.sleep(self.next_slot - now)
+        self.next_slot = max(now, self.next_slot) + self.min_interval
+        self.request_count += 1
+
+    def request(self, method, url, **kwargs):
+        self._wait_slot()
+        kwargs.setdefault("timeout", self.request_timeout)
+        return super().request(method, url, **kwargs)
+
+    def get_raw(self, url):
+        """
+        GET that sends the path byte-for-byte. requests/urllib3 normalize
+        percent-escapes (%2e -> %2E, % -> %25), which breaks payloads that
+        depend on the exact encoding. Returns (status, body text); the body
+        is capped at RAW_BODY_LIMIT. Shares the rate limit and timeout.
+        """
+        self._wait_slot()
+        parts = urlsplit(url)
+        path = url[len(f"{parts.scheme}://{parts.netloc}"):] or "/"
+        if parts.scheme == "https":
+            connection = http.client.HTTPSConnection(parts.hostname, parts.port, timeout=self.request_timeout,
+                                                     context=ssl._create_unverified_context())
+        else:
+            connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=self.request_timeout)
+        try:
+            connection.request("GET", path, headers={"User-Agent": self.headers["User-Agent"]})
+            response = connection.getresponse()
+            return response.status, response.read(RAW_BODY_LIMIT).decode("utf-8", errors="replace")
+        except TimeoutError as e:
+            raise requests.Timeout(str(e)) from e
+        finally:
+            connection.close()
+
+
+def load_checks():
+    """
+    Discovers check plugins. Returns {template id / CVE id: module name}.
+    """
+    registry = {}
+    for module_info in pkgutil.iter_modules(checks.__path__):
+        module = importlib.import_module(f"{checks.__name__}.{module_info.name}")
+        if not callable(getattr(module, "check", None)):
+            continue
+        for template_id in getattr(module, "TEMPLATES", []):
+            registry[template_id.lower()] = module_info.name
+        for cve_id in getattr(module, "CVES", []):
+            registry[cve_id.upper()] = module_info.name
+    return registry
+
+
+def _priority(finding):
+    """
+    Sort key: KEV-listed first, then severity, then EPSS (highest first).
+    """
+    enrichment = finding.get("enrichment") or []
+    in_kev = any(e.get("in_kev") for e in enrichment)
+    epss = max([e.get("epss") or 0.0 for e in enrichment] or [0.0])
+    severity = ((finding.get("info") or {}).get("severity") or "").lower()
+    return (not in_kev, SEVERITY_RANK.get(severity, 5), -epss)
+
+
+def _finding_cves(finding):
+    cves = ((finding.get("info") or {}).get("classification") or {}).get("cve-id") or []
+    if isinstance(cves, str):
+        cves = [cves]
+    return [c.upper() for c in cves if c]
+
+
+def _base_url(target):
+    """
+    Returns (base URL, "host:port" service key); the key is "" without a host.
+    """
+    if "://" not in target:
+        target = f"http://{target}"
+    parts = urlsplit(target)
+    if not parts.hostname:
+        return f"{parts.scheme}://{parts.netloc}", ""
+    try:
+        port = parts.port or {"https": 443}.get(parts.scheme, 80)
+    except ValueError:
+        return f"{parts.scheme}://{parts.netloc}", ""
+    return f"{parts.scheme}://{parts.netloc}", f"{parts.hostname}:{port}"
+
+
+def _init_worker(memory_mb, max_files):
+    if resource is None:
+        return
+    limits = [(resource.RLIMIT_CORE, 0), (resource.RLIMIT_NOFILE, max_files)]
+    if memory_mb and hasattr(resource, "RLIMIT_AS"):
+        # Forked workers inherit the parent's address space; the limit is
+        # memory_mb of headroom on top of what the worker starts with
+        baseline = 0
+        try:
+            with open("/proc/self/statm") as f:
+                baseline = int(f.read().split()[0]) * resource.getpagesize()
+        except (OSError, ValueError, IndexError):
+            pass
+        limits.append((resource.RLIMIT_AS, baseline + memory_mb * 1024 * 1024))
+    for limit, value in limits:
+        try:
+            soft, hard = resource.getrlimit(limit)
+            if hard != resource.RLIM_INFINITY:
+                value = min(value, hard)
+            resource.setrlimit(limit, (value, hard))
+        except (ValueError, OSError):
+            continue
+
+    import urllib3
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+
+def _on_alarm(signum, frame):
+    raise CheckTimeout()
+
+
+def _verify_host(host, jobs, check_timeout, rate):
+    """
+    Worker task: runs every job for one host on a shared session.
+    jobs: [(finding indices, module name, finding summary, base_url)]
+    Returns (host, [(finding indices, result)], requests sent).
+    """
+    use_alarm = hasattr(signal, "SIGALRM")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _on_alarm)
+
+    results = []
+    with RateLimitedSession(rate, min(REQUEST_TIMEOUT, check_timeout)) as session:
+        for indices, module_name, finding, base_url in jobs:
+            started = time.perf_counter()
+            result = {"check": module_name}
+            try:
+                module = importlib.import_module(f"{checks.__name__}.{module_name}")
+                if use_alarm:
+                    signal.setitimer(signal.ITIMER_REAL, check_timeout)
+                try:
+                    vulnerable, evidence = module.check(session, finding, base_url)
+                finally:
+                    if use_alarm:
+                        signal.setitimer(signal.ITIMER_REAL, 0)
+                result.update({"status": "success" if vulnerable else "failure",
+                               "vulnerable": bool(vulnerable), "evidence": str(evidence)[:500]})
+            except CheckTimeout:
+                result.update({"status": "timeout", "error": f"Check exceeded {check_timeout}s"})
+            except requests.Timeout:
+                result.update({"status": "timeout", "error": "Target did not respond in time"})
+            except Exception as e:
+                result.update({"status": "error", "error": f"{type(e).__name__}: {str(e)[:300]}"})
+            result["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            results.append((indices, result))
+        return host, results, session.request_count
+
+
+class Verifier:
+    def __init__(self, workers=DEFAULT_WORKERS, check_timeout=CHECK_TIMEOUT, rate=REQUESTS_PER_SECOND,
+                 memory_mb=WORKER_MEMORY_MB, scope=None):
+        self.workers = workers
+        self.check_timeout = check_timeout
+        self.rate = rate
+        self.memory_mb = memory_mb
+        # Authorized scope (modules.scope.ScopeEngine); None means unrestricted
+        self.scope = scope if scope is not None else get_default_scope()
+        self.registry = load_checks()
+
+    def _plan(self, findings):
+        """
+        Matches findings to checks and groups them by host:port, in priority order.
+        Returns ({host: [job]}, skipped count by reason).
+        """
+        by_host = {}
+        skipped = {"no_check": 0, "out_of_scope": 0}
+        order = sorted(range(len(findings)), key=lambda i: _priority(findings[i]))
+
+        for index in order:
+            finding = findings[index]
+            template_id = (finding.get("template-id") or finding.get("templateID") or "").lower()
+            cves = _finding_cves(finding)
+            module_name = self.registry.get(template_id)
+            for cve in cves:
+                module_name = module_name or self.registry.get(cve)
+            if not module_name:
+                skipped["no_check"] += 1
+                continue
+
+            matched_at = finding.get("matched-at") or finding.get("host") or ""
+            base_url, host = _base_url(matched_at)
+            if not host:
+                skipped["no_check"] += 1
+                continue
+            if self.scope is not None and not self.scope.check(base_url):
+                finding["verification"] = {"status": "skipped", "error": "Target is outside the authorized scope."}
+                skipped["out_of_scope"] += 1
+                continue
+
+            # Findings that would run the same check on the same URL (e.g. one
+            # nuclei result per missing header) share a single execution
+            url = matched_at if "://" in matched_at else ""
+            jobs = by_host.setdefault(host, {})
+            job = jobs.get((module_name, url or base_url))
+            if job is None:
+                summary = {"template_id": template_id, "matched_at": url, "cves": cves}
+                jobs[(module_name, url or base_url)] = ([index], module_name, summary, base_url)
+            else:
+                job[0].append(index)
+        return {host: list(jobs.values()) for host, jobs in by_host.items()}, skipped
+
+    def verify_findings(self, findings):
+        """
+        Runs matching checks for nuclei findings and attaches a "verification"
+        result to each verified finding in place. Returns a summary.
+        """
+        started = time.time()
+        by_host, skipped = self._plan(findings)
+        counts = {"success": 0, "failure": 0, "timeout": 0, "error": 0}
+        executions = sum(len(jobs) for jobs in by_host.values())
+        verified = sum(len(job[0]) for jobs in by_host.values() for job in jobs)
+        requests_sent = 0
+
+        if executions:
+            print(f"[*] Verifying {verified} findings ({executions} checks) on {len(by_host)} host:port targets "
+                  f"({self.workers} workers, {self.rate} req/s per host)...")
+            workers = max(1, min(self.workers, len(by_host)))
+            executor = ProcessPoolExecutor(max_workers=workers,
+                                           initializer=_init_worker,
+                                           initargs=(self.memory_mb, WORKER_MAX_FILES))
+            futures = {}
+            budgets = []
+            for host, jobs in by_host.items():
+                future = executor.submit(_verify_host, host, jobs, self.check_timeout, self.rate)
+                futures[future] = (host, jobs)
+                # A host takes at most its checks' timeouts plus rate-limit spacing
+                budgets.append(len(jobs) * (self.check_timeout + 1.0 / max(self.rate, 0.1)))
+            # Hosts queue behind each other when there are more hosts than workers
+            deadline = started + sum(budgets) / workers + max(budgets) + 30
+
+            stalled = False
+            for future, (host, jobs) in futures.items():
+                try:
+                    _, results, sent = future.result(timeout=max(deadline - time.time(), 1))
+                    requests_sent += sent
+                except FutureTimeout:
+                    # The SIGALRM timeout is unavailable (Windows) or the worker is stuck
+                    stalled = True
+                    results = [(indices, {"check": module_name, "status": "timeout",
+                                          "error": "Host verification exceeded its deadline"})
+                               for indices, module_name, _, _ in jobs]
+                except Exception as e:
+                    # Worker crashed (e.g. hit its memory limit)
+                    results = [(indices, {"check": module_name, "status": "error",
+                                          "error": f"Worker failed: {type(e).__name__}: {str(e)[:200]}"})
+                               for indices, module_name, _, _ in jobs]
+                for indices, result in results:
+                    for index in indices:
+                        findings[index]["verification"] = dict(result)
+                        counts[result["status"]] += 1
+            if stalled:
+                # A hung worker (no SIGALRM on Windows, or stuck outside Python)
+                # would keep running after shutdown(); terminate the pool instead
+                processes = list((executor._processes or {}).values())
+                executor.shutdown(wait=False, cancel_futures=True)
+                for process in processes:
+                    if process.is_alive():
+                        process.terminate()
+                for process in processes:
+                    process.join(timeout=5)
+            else:
+                executor.shutdown(wait=True)
+
+        duration = time.time() - started
+        return {
+            "checks_available": len(set(self.registry.values())),
+            "verified": verified,
+            "executions": executions,
+            "hosts": len(by_host),
+            "requests_sent": requests_sent,
+            "true_positives": counts["success"],
+            "not_vulnerable": counts["failure"],
+            "timeouts": counts["timeout"],
+            "errors": counts["error"],
+            "skipped": skipped,
+            "duration_seconds": round(duration, 2),
+            "checks_per_second": round(executions / duration, 1) if executions and duration else 0.0,
+        }
+
+
+_default_verifier = None
+
+
+def get_default_verifier():
+    """
+    Returns a process-wide Verifier when VAPT_VERIFY is enabled, else None.
+    Verification sends requests to the target, so it is opt-in.
+    """
+    global _default_verifier
+    if _default_verifier is None and os.environ.get("VAPT_VERIFY", "").lower() in ("1", "true", "yes"):
+        _default_verifier = Verifier()
+    return _default_verifier
@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# The modules import each other as "modules.*" from src/, like api.py and main.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+# Keep scan output out of the working tree
+os.environ.setdefault("VAPT_SCANS_DIR", tempfile.mkdtemp(prefix="vapt-tests-"))
@@ -0,0 +1,49 @@
+import json
+import os
+
+from modules.enrichment import CVEIndex, build_index, get_shared_index, resolve_index_path
+
+
+def _write_kev(path, cves):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"vulnerabilities": [{"cveID": cve, "vendorProject": "v", "product": "p"} for cve in cves]}, f)
+
+
+def _write_epss(path, rows):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("#model_version:v2023.03.01,score_date:2026-01-01\ncve,epss,percentile\n")
+        for cve, epss in rows:
+            f.write(f"{cve},{epss},0.9\n")
+
+
+def test_update_layers_on_the_existing_index(tmp_path):
+    index_path = str(tmp_path / "cve_index.bin")
+    kev, epss = str(tmp_path / "kev.json"), str(tmp_path / "epss.csv")
+    _write_kev(kev, ["CVE-2021-44228"])
+    _write_epss(epss, [("CVE-2023-12345", 0.5)])
+
+    build_index(index_path, kev_paths=[kev])
+    build_index(index_path, epss_paths=[epss], base_path=index_path)
+
+    with CVEIndex(index_path) as index:
+        assert len(index) == 2
+        assert index.lookup("CVE-2021-44228")["in_kev"]
+        assert index.lookup("CVE-2023-12345")["epss"] == 0.5
+
+
+def test_rebuild_writes_a_new_version_and_the_shared_index_follows(tmp_path):
+    index_path = str(tmp_path / "cve_index.bin")
+    kev = str(tmp_path / "kev.json")
+    _write_kev(kev, ["CVE-2021-44228"])
+    build_index(index_path, kev_paths=[kev])
+    first_version = resolve_index_path(index_path)
+    first = get_shared_index(index_path)
+
+    _write_kev(kev, ["CVE-2021-44228", "CVE-2021-41773"])
+    build_index(index_path, kev_paths=[kev])
+
+    assert resolve_index_path(index_path) != first_version
+    assert not os.path.exists(first_version)
+    current = get_shared_index(index_path)
+    assert current is not first
+    assert len(current) == 2
@@ -0,0 +1,39 @@
+from modules.port_scanner import parse_port_spec, resolve_port_set
+from modules.recon import ReconScanner
+from modules.scope import ScopeEngine
+
+
+def _discovery_port_args(scanner, **kwargs):
+    """
+    Runs run_full_port_scan with nmap replaced by a recorder and returns the
+    -p value of every discovery shard.
+    """
+    calls = []
+
+    def fake_nmap_xml(args, hosts, tag, timeout):
+        calls.append(args[args.index("-p") + 1])
+        return {"hosts": {}, "raw_log": {}}
+
+    scanner.nmap_path = "nmap"
+    scanner._run_nmap_xml = fake_nmap_xml
+    scanner.run_full_port_scan(["10.0.0.1", "10.0.0.2"], service_detection=False, **kwargs)
+    return calls
+
+
+def test_named_port_sets_are_passed_to_nmap_as_ports():
+    scanner = ReconScanner()
+    scanner.scope = None  # unrestricted, whatever VAPT_SCOPE_FILE says
+    for name in ("top100", "top1000", "full"):
+        for spec in _discovery_port_args(scanner, ports=name):
+            assert parse_port_spec(spec) == resolve_port_set(name)
+
+
+def test_explicit_port_spec_is_kept():
+    scanner = ReconScanner()
+    scanner.scope = None  # unrestricted, whatever VAPT_SCOPE_FILE says
+    assert set(_discovery_port_args(scanner, ports="1-65535")) == {"1-65535"}
+
+
+def test_scope_narrows_discovery_ports():
+    scanner = ReconScanner(scope=ScopeEngine(allow=["10.0.0.0/24:22,80,443"]))
+    assert set(_discovery_port_args(scanner, ports="top1000")) == {"22,80,443"}
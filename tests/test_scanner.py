@@ -0,0 +1,6 @@
+from modules.scanner import NIKTO_TUNING_SHARDS
+
+
+def test_tuning_shards_cover_every_category_but_dos():
+    categories = "".join(NIKTO_TUNING_SHARDS)
+    assert sorted(categories) == sorted("012345789abcde")
@@ -0,0 +1,111 @@
+import pytest
+
+from modules.port_scanner import format_port_spec, parse_port_spec
+from modules.recon import ReconScanner
+from modules.scanner import VulnScanner
+from modules.scope import ALL_PORTS, ScopeEngine
+
+
+def test_host_and_cidr_rules():
+    scope = ScopeEngine(allow=["10.0.0.0/8", "example.com", "*.corp.example.org"], deny=["10.1.0.0/16"])
+    assert scope.check("10.2.3.4")
+    assert not scope.check("10.1.2.3")
+    assert not scope.check("11.0.0.1")
+    assert scope.check("EXAMPLE.com")
+    assert not scope.check("www.example.com")
+    assert scope.check("a.corp.example.org")
+    assert not scope.check("corp.example.org")
+    assert not scope.check("")
+
+
+def test_ipv6_rules():
+    scope = ScopeEngine(allow=["2001:db8::/32"], deny=["[2001:db8::5]:22"])
+    assert scope.check("2001:db8::1")
+    assert scope.check("[2001:db8::5]:443")
+    assert not scope.check("[2001:db8::5]:22")
+    assert not scope.check("2001:db9::1")
+
+
+def test_port_restricted_allow_only_allows_those_ports():
+    scope = ScopeEngine(allow=["example.com:443"])
+    # A bare host is in scope because one of its ports is
+    assert scope.check("example.com")
+    assert scope.check("example.com", 443)
+    assert scope.check("https://example.com/login")
+    assert not scope.check("example.com", 22)
+    assert not scope.check("http://example.com")
+    assert scope.allowed_ports("example.com", range(1, 65536)) == [443]
+
+
+def test_port_specific_deny_keeps_the_rest_of_the_host():
+    scope = ScopeEngine(allow=["10.0.0.0/24"], deny=["10.0.0.5:22"])
+    assert scope.check("10.0.0.5")
+    assert scope.check("10.0.0.5", 80)
+    assert not scope.check("10.0.0.5", 22)
+    assert scope.allowed_ports("10.0.0.5", [21, 22, 23]) == [21, 23]
+    assert scope.allowed_ports("10.0.0.6", [21, 22, 23]) == [21, 22, 23]
+
+
+def test_portless_deny_removes_the_host():
+    scope = ScopeEngine(allow=["*.example.com"], deny=["admin.example.com"])
+    assert not scope.check("admin.example.com")
+    assert not scope.check("admin.example.com", 443)
+    assert scope.allowed_ports("admin.example.com", [80, 443]) == []
+    assert scope.port_policy("admin.example.com") is None
+
+
+def test_deny_covering_every_allowed_port_removes_the_host():
+    scope = ScopeEngine(allow=["example.com:80,443"], deny=["example.com:80", "*.com:443"])
+    assert not scope.check("example.com")
+    assert scope.allowed_ports("example.com", [80, 443]) == []
+
+
+def test_port_policy_is_shared_by_hosts_with_the_same_rules():
+    scope = ScopeEngine(allow=["10.0.0.0/24:80,443", "10.0.1.0/24"], deny=["10.0.1.9:3389"])
+    assert scope.port_policy("10.0.0.1") == scope.port_policy("10.0.0.2")
+    assert scope.port_policy("10.0.1.1") == (ALL_PORTS, frozenset())
+    assert scope.port_policy("10.0.1.9") == (ALL_PORTS, frozenset({3389}))
+    assert ScopeEngine.apply_policy(scope.port_policy("10.0.0.1"), [22, 443, 80]) == [443, 80]
+
+
+def test_filter_uses_ports_from_targets():
+    scope = ScopeEngine(allow=["example.com:443", "10.0.0.1"])
+    inside, outside = scope.filter(["https://example.com", "http://example.com", "example.com:8443",
+                                    "10.0.0.1", "10.0.0.2"])
+    assert inside == ["https://example.com", "10.0.0.1"]
+    assert outside == ["http://example.com", "example.com:8443", "10.0.0.2"]
+
+
+def test_invalid_rule():
+    with pytest.raises(ValueError):
+        ScopeEngine(allow=["not a host"])
+
+
+def test_port_spec_round_trip():
+    assert format_port_spec([443, 22, 80, 81, 82, 80]) == "22,80-82,443"
+    assert parse_port_spec(format_port_spec([1, 2, 3, 65535])) == [1, 2, 3, 65535]
+    assert format_port_spec([]) == ""
+
+
+def test_recon_narrows_ports_and_results_to_scope():
+    recon = ReconScanner(scope=ScopeEngine(allow=["example.com:443,8443"], deny=["example.com:8443"]))
+    assert recon._scope_ports("example.com", [22, 80, 443, 8443]) == [443]
+    results = [{"port": "22/tcp"}, {"port": "443/tcp"}, {"port": "8443/tcp"}]
+    assert recon._drop_out_of_scope_ports("example.com", results) == [{"port": "443/tcp"}]
+    assert recon._http_target("example.com") == "https://example.com"
+    assert recon._http_target("http://example.com") == "http://example.com"
+
+
+def test_recon_refuses_hosts_without_in_scope_ports():
+    recon = ReconScanner(scope=ScopeEngine(allow=["example.com:22"]))
+    assert recon._http_target("example.com") is None
+    assert "error" in recon.run_tcp_connect_scan("example.com", port_set="80,443")
+    assert "error" in recon.run_full_port_scan(["example.com"], ports="80,443", discovery="connect")
+
+
+def test_web_scanners_pick_the_allowed_scheme():
+    scanner = VulnScanner(scope=ScopeEngine(allow=["secure.example.com:443", "plain.example.com"]))
+    assert scanner._web_target("secure.example.com") == "https://secure.example.com"
+    assert scanner._web_target("plain.example.com") == "http://plain.example.com"
+    assert scanner._scope_error(scanner._web_target("secure.example.com")) is None
+    assert scanner._scope_error("http://secure.example.com") is not None